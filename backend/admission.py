@@ -0,0 +1,86 @@
+import threading
+from contextlib import contextmanager
+
+class Overloaded(Exception):
+    def __init__(self, name, reason):
+        super().__init__(f"{name} is saturated ({reason})")
+        self.name = name
+        self.reason = reason
+
+class AdmissionLimiter:
+    def __init__(self, name, max_concurrent, max_queue=0, queue_timeout=0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    def acquire(self):
+        with self._condition:
+            if self.in_flight < self.max_concurrent and not self.queued:
+                self.in_flight += 1
+                self.admitted += 1
+                return
+            if self.queued >= self.max_queue:
+                self.shed_queue_full += 1
+                raise Overloaded(self.name, 'queue full')
+            self.queued += 1
+            try:
+                admitted = self._condition.wait_for(lambda: self.in_flight < self.max_concurrent,
+                                                    timeout=self.queue_timeout)
+            finally:
+                self.queued -= 1
+            if not admitted:
+                self.shed_timeout += 1
+                raise Overloaded(self.name, 'queue timeout')
+            self.in_flight += 1
+            self.admitted += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'queue_timeout': self.queue_timeout,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'admitted': self.admitted,
+                'shed': self.shed_queue_full + self.shed_timeout,
+                'shed_queue_full': self.shed_queue_full,
+                'shed_timeout': self.shed_timeout
+            }
+
+def init_app(app):
+    config = app.config
+    app.extensions['admission'] = {
+        'chart_render': AdmissionLimiter(
+            'chart_render',
+            config['CHART_RENDER_CONCURRENCY'],
+            config['CHART_RENDER_QUEUE_SIZE'],
+            config['CHART_RENDER_QUEUE_TIMEOUT']
+        ),
+        'lazy_charts': AdmissionLimiter(
+            'lazy_charts',
+            config['LAZY_CHART_CONCURRENCY'],
+            config['LAZY_CHART_QUEUE_SIZE'],
+            config['LAZY_CHART_QUEUE_TIMEOUT']
+        ),
+    }
@@ -1,22 +1,59 @@
+import json
+import click
 from flask import Flask
 from flask_cors import CORS
 from config import Config
-from models import db
-from routes import api
+from models import db, init_schema
+from routes import api, health_snapshot
+from serialization import FastJSONProvider
+from cache import LRUCache
+import admission
+import health_stream
+import memory_profiling
+import ranking
+import startup
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    profile = app.extensions['startup_profile'] = startup.StartupProfile()
 
-    CORS(app, origins=Config.CORS_ORIGINS)
+    with profile.phase('create_app:extensions'):
+        CORS(app, origins=app.config['CORS_ORIGINS'], expose_headers=['X-Next-Cursor'])
+        db.init_app(app)
 
-    db.init_app(app)
+    app.extensions['recommendations_cache'] = LRUCache(
+        max_size=app.config['RECOMMENDATIONS_CACHE_SIZE'],
+        ttl=app.config['RECOMMENDATIONS_CACHE_TTL']
+    )
 
-    app.register_blueprint(api)
+    admission.init_app(app)
+    ranking.init_app(app)
+
+    with profile.phase('create_app:blueprints'):
+        app.register_blueprint(api)
+        memory_profiling.init_app(app)
+        health_stream.init_app(app, health_snapshot)
+        startup.init_app(app)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        with profile.phase('create_app:schema'):
+            init_schema()
+        click.echo('Database schema created.')
+
+    @app.cli.command('startup-profile')
+    @click.option('--limit', default=15, help='Number of slowest imports to show.')
+    def startup_profile_command(limit):
+        click.echo(json.dumps(startup.profile_imports('app', limit), indent=2))
+
+    if not app.config['FAST_START']:
+        with app.app_context(), profile.phase('create_app:schema'):
+            init_schema()
 
-    with app.app_context():
-        db.create_all()
-        
     return app
 
 app = create_app()
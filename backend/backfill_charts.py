@@ -0,0 +1,124 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import bindparam, or_, update
+from models import db, Budget
+from routes import CHART_FORMATS, generate_charts
+import serialization
+import startup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _init_worker():
+    startup.load_chart_stack()
+
+def _render_charts(budget_id, calculations, chart_format='png'):
+    try:
+        charts = generate_charts(serialization.loads(calculations), budget_id, chart_format=chart_format)
+        return budget_id, serialization.dumps(charts), None
+    except Exception as e:
+        return budget_id, None, str(e)
+
+def select_budget_ids(start_id=None, end_id=None, since=None, until=None, missing_only=False):
+    query = db.session.query(Budget.id)
+    if start_id is not None:
+        query = query.filter(Budget.id >= start_id)
+    if end_id is not None:
+        query = query.filter(Budget.id <= end_id)
+    if since is not None:
+        query = query.filter(Budget.created_at >= since)
+    if until is not None:
+        query = query.filter(Budget.created_at <= until)
+    if missing_only:
+        query = query.filter(or_(Budget.charts.is_(None), Budget.charts == '', Budget.charts == '{}'))
+    return [row.id for row in query.order_by(Budget.id)]
+
+# Bumping version invalidates ETags that were issued for the budget without charts.
+_UPDATE_CHARTS = (update(Budget.__table__)
+                  .where(Budget.__table__.c.id == bindparam('budget_id'))
+                  .values(charts=bindparam('new_charts'), version=Budget.__table__.c.version + 1))
+
+def _write_batch(results):
+    updates = [{'budget_id': budget_id, 'new_charts': charts}
+               for budget_id, charts, error in results if error is None]
+    if updates:
+        db.session.execute(_UPDATE_CHARTS, updates)
+        db.session.commit()
+    for budget_id, _, error in results:
+        if error is not None:
+            logger.error(f"Backfill: failed to render charts for budget {budget_id}: {error}")
+    return len(updates)
+
+def backfill_charts(budget_ids, workers=None, batch_size=50, chart_format='png'):
+    workers = workers or os.cpu_count() or 1
+    total = len(budget_ids)
+    summary = {'selected': total, 'rendered': 0, 'failed': 0, 'workers': workers, 'seconds': 0.0}
+    if not total:
+        return summary
+
+    start_time = time.perf_counter()
+    batches = [budget_ids[i:i + batch_size] for i in range(0, total, batch_size)]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+        def submit(batch):
+            rows = db.session.query(Budget.id, Budget.calculations).filter(Budget.id.in_(batch)).all()
+            return [executor.submit(_render_charts, row.id, row.calculations, chart_format) for row in rows]
+
+        # Keep the next batch queued while the current one is written back so workers never idle.
+        pending = deque(submit(batch) for batch in batches[:2])
+        next_batch = 2
+        done = 0
+        while pending:
+            results = [future.result() for future in pending.popleft()]
+            if next_batch < len(batches):
+                pending.append(submit(batches[next_batch]))
+                next_batch += 1
+            written = _write_batch(results)
+            done += len(results)
+            summary['rendered'] += written
+            summary['failed'] += len(results) - written
+            elapsed = time.perf_counter() - start_time
+            logger.info(f"Backfill: {done}/{total} budgets | "
+                        f"Rendered: {summary['rendered']} | "
+                        f"Failed: {summary['failed']} | "
+                        f"Throughput: {done / elapsed:.2f} budgets/s")
+
+    summary['seconds'] = round(time.perf_counter() - start_time, 3)
+    summary['budgets_per_second'] = round(total / summary['seconds'], 2) if summary['seconds'] else None
+    return summary
+
+def _parse_date(value):
+    return datetime.fromisoformat(value)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Regenerate charts for stored budgets.')
+    parser.add_argument('--start-id', type=int, help='Lowest budget ID to include')
+    parser.add_argument('--end-id', type=int, help='Highest budget ID to include')
+    parser.add_argument('--since', type=_parse_date, help='Only budgets created at or after this ISO date')
+    parser.add_argument('--until', type=_parse_date, help='Only budgets created at or before this ISO date')
+    parser.add_argument('--missing-only', action='store_true', help='Only budgets without stored charts')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=50, help='Budgets written back per commit')
+    parser.add_argument('--chart-format', choices=CHART_FORMATS, default=None,
+                        help='Chart output format (default: CHART_FORMAT config)')
+    args = parser.parse_args(argv)
+
+    from app import app
+    with app.app_context():
+        budget_ids = select_budget_ids(args.start_id, args.end_id, args.since, args.until, args.missing_only)
+        print(f"Selected {len(budget_ids)} budget(s) for chart regeneration.")
+        chart_format = args.chart_format or app.config['CHART_FORMAT']
+        summary = backfill_charts(budget_ids, workers=args.workers, batch_size=args.batch_size,
+                                  chart_format=chart_format)
+        print(f"Rendered {summary['rendered']} budget(s), {summary['failed']} failed, "
+              f"in {summary['seconds']:.1f}s using {summary['workers']} worker(s).")
+    return summary
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import base64
+import json
+import os
+import time
+from routes import calculate_budget
+import serialization
+
+SAMPLE_INPUT = {
+    'name': 'Benchmark Budget',
+    'yearly_salary': '75000',
+    'pay_per_check': '2884.62',
+    'pay_frequency': 'bi-weekly',
+    'retirement_401k': '10',
+    'employer_401k_match': '5',
+    'rent_mortgage': '1200',
+    'car_insurance': '150',
+    'phone_bill': '80',
+    'miscellaneous': '300'
+}
+
+def _throughput(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed
+
+def run(iterations=20000):
+    calc = calculate_budget(SAMPLE_INPUT)
+    calc_dict = calc.to_dict()
+    charts = {name: base64.b64encode(os.urandom(150000)).decode()
+              for name in ('expense_breakdown', 'savings_projection', '401k_breakdown')}
+    budget = {'id': '1', 'name': SAMPLE_INPUT['name'], 'input_data': SAMPLE_INPUT,
+              'calculations': calc_dict, 'charts': charts}
+    calc_text = json.dumps(calc_dict)
+    budget_text = json.dumps(budget)
+    chart_iterations = max(iterations // 100, 10)
+
+    cases = [
+        ('calculations encode', iterations,
+         lambda: json.dumps(calc_dict), lambda: serialization.dumps(calc)),
+        ('calculations decode', iterations,
+         lambda: json.loads(calc_text), lambda: serialization.loads(calc_text)),
+        ('budget with charts encode', chart_iterations,
+         lambda: json.dumps(budget), lambda: serialization.dumps(budget)),
+        ('budget with charts decode', chart_iterations,
+         lambda: json.loads(budget_text), lambda: serialization.loads(budget_text)),
+    ]
+    print(f"Serialization backend: {serialization.backend_name()}")
+    print(f"{'case':<28}{'json ops/s':>14}{'fast ops/s':>14}{'speedup':>10}")
+    results = []
+    for name, count, before, after in cases:
+        before_rate = _throughput(before, count)
+        after_rate = _throughput(after, count)
+        results.append({'case': name, 'before': before_rate, 'after': after_rate})
+        print(f"{name:<28}{before_rate:>14,.0f}{after_rate:>14,.0f}{after_rate / before_rate:>9.1f}x")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark JSON encode/decode throughput.')
+    parser.add_argument('--iterations', type=int, default=20000)
+    run(parser.parse_args().iterations)
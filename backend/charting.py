@@ -0,0 +1,11 @@
+import base64
+from io import BytesIO
+
+def encode_chart(plt):
+    buffer = BytesIO()
+    plt.tight_layout()
+    plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
+    buffer.seek(0)
+    chart_image = base64.b64encode(buffer.getvalue()).decode()
+    plt.close()
+    return chart_image
@@ -0,0 +1,72 @@
+from dataclasses import fields
+from charting import encode_chart
+from models import BudgetCalculation
+import startup
+
+SCALAR_FIELDS = [field.name for field in fields(BudgetCalculation)
+                 if field.name not in ('projections', 'expense_breakdown')]
+EXPENSE_CATEGORIES = ['rent_mortgage', 'car_insurance', 'phone_bill', 'miscellaneous',
+                      'liquid_savings', '401k_employee_savings', '401k_employer_savings', '401k_total_savings']
+PROJECTION_PERIODS = ['1_year', '2_years', '10_years']
+PROJECTION_KINDS = ['liquid', '401k_employee', '401k_employer', '401k_total', 'total']
+
+def _to_list(array):
+    return [None if value != value else float(value) for value in array.tolist()]
+
+def _series(np, matrix, baseline_index):
+    baseline = matrix[baseline_index]
+    delta = matrix - baseline
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.where(baseline != 0, delta / np.abs(baseline) * 100, np.nan)
+    return [
+        {'values': _to_list(matrix[:, column]),
+         'delta': _to_list(delta[:, column]),
+         'percent_change': _to_list(percent[:, column])}
+        for column in range(matrix.shape[1])
+    ]
+
+def compare_budgets(calculations, baseline_index=0):
+    import numpy as np
+
+    scalars = np.array([[float(calc.get(name) or 0) for name in SCALAR_FIELDS] for calc in calculations])
+    breakdown = np.array([[float(calc.get('expense_breakdown', {}).get(name) or 0) for name in EXPENSE_CATEGORIES]
+                          for calc in calculations])
+    projections = np.array([[float(calc.get('projections', {}).get(period, {}).get(kind) or 0)
+                             for period in PROJECTION_PERIODS for kind in PROJECTION_KINDS]
+                            for calc in calculations])
+    income = scalars[:, SCALAR_FIELDS.index('monthly_income')][:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = np.where(income > 0, breakdown / income * 100, np.nan)
+
+    projection_series = _series(np, projections, baseline_index)
+    return {
+        'fields': dict(zip(SCALAR_FIELDS, _series(np, scalars, baseline_index))),
+        'expense_shares': dict(zip(EXPENSE_CATEGORIES, _series(np, shares, baseline_index))),
+        'projections': {
+            period: dict(zip(PROJECTION_KINDS, projection_series[i * len(PROJECTION_KINDS):(i + 1) * len(PROJECTION_KINDS)]))
+            for i, period in enumerate(PROJECTION_PERIODS)
+        }
+    }
+
+def generate_comparison_chart(names, calculations):
+    plt, sns, np = startup.load_chart_stack()
+
+    plt.style.use('seaborn-v0_8')
+    expenses = np.array([float(calc.get('total_expenses') or 0) for calc in calculations])
+    liquid = np.array([max(float(calc.get('liquid_savings') or 0), 0) for calc in calculations])
+    retirement = np.array([float(calc.get('monthly_401k_total') or 0) for calc in calculations])
+    colors = sns.color_palette("husl", 3)
+    x = np.arange(len(names))
+
+    fig, ax = plt.subplots(figsize=(max(8, min(len(names) * 0.6, 24)), 8))
+    ax.bar(x, expenses, label='Total Expenses', color=colors[0], alpha=0.8)
+    ax.bar(x, liquid, bottom=expenses, label='Liquid Savings', color=colors[1], alpha=0.8)
+    ax.bar(x, retirement, bottom=expenses + liquid, label='401k Contributions', color=colors[2], alpha=0.8)
+    ax.set_ylabel('Monthly Amount ($)', fontsize=12, fontweight='bold')
+    ax.set_title('Budget Comparison', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xticks(x)
+    ax.set_xticklabels(names, rotation=45 if len(names) > 4 else 0, ha='right' if len(names) > 4 else 'center')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+    return encode_chart(plt)
@@ -13,8 +13,30 @@ class Config:
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
         f"{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     )
-    SQLALCHEMY_DATABASE_URI = DATABASE_URL
+    SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI', DATABASE_URL)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     DEBUG = os.environ.get('FLASK_ENV') == 'development'
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000').split(',')
+    FAST_START = os.environ.get('FAST_START', 'false').lower() == 'true'
+    PREWARM_CHARTS = os.environ.get('PREWARM_CHARTS', 'false').lower() == 'true'
+    DEDUP_WINDOW_SECONDS = int(os.environ.get('DEDUP_WINDOW_SECONDS', '0'))
+    COMPARE_MAX_BUDGETS = int(os.environ.get('COMPARE_MAX_BUDGETS', '100'))
+    BULK_MAX_BUDGETS = int(os.environ.get('BULK_MAX_BUDGETS', '100'))
+    RECOMMENDATIONS_CACHE_SIZE = int(os.environ.get('RECOMMENDATIONS_CACHE_SIZE', '1024'))
+    RECOMMENDATIONS_CACHE_TTL = float(os.environ.get('RECOMMENDATIONS_CACHE_TTL', '0'))
+    CHART_RENDER_CONCURRENCY = int(os.environ.get('CHART_RENDER_CONCURRENCY', '2'))
+    CHART_RENDER_QUEUE_SIZE = int(os.environ.get('CHART_RENDER_QUEUE_SIZE', '8'))
+    CHART_RENDER_QUEUE_TIMEOUT = float(os.environ.get('CHART_RENDER_QUEUE_TIMEOUT', '10'))
+    LAZY_CHART_CONCURRENCY = int(os.environ.get('LAZY_CHART_CONCURRENCY', '1'))
+    LAZY_CHART_QUEUE_SIZE = int(os.environ.get('LAZY_CHART_QUEUE_SIZE', '4'))
+    LAZY_CHART_QUEUE_TIMEOUT = float(os.environ.get('LAZY_CHART_QUEUE_TIMEOUT', '5'))
+    OVERLOAD_RETRY_AFTER = int(os.environ.get('OVERLOAD_RETRY_AFTER', '5'))
+    DEGRADED_MODE = os.environ.get('DEGRADED_MODE', 'false').lower() == 'true'
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    MEMORY_MAX_SNAPSHOTS = int(os.environ.get('MEMORY_MAX_SNAPSHOTS', '5'))
+    CHART_FORMAT = os.environ.get('CHART_FORMAT', 'png').lower()
+    RANK_REBUILD_INTERVAL = int(os.environ.get('RANK_REBUILD_INTERVAL', '300'))
+    HEALTH_STREAM_INTERVAL = float(os.environ.get('HEALTH_STREAM_INTERVAL', '5'))
+    HEALTH_STREAM_HEARTBEAT = float(os.environ.get('HEALTH_STREAM_HEARTBEAT', '15'))
+    ENDPOINT_STATS_WINDOW = int(os.environ.get('ENDPOINT_STATS_WINDOW', '60'))
@@ -0,0 +1,67 @@
+INPUT_FIELDS = ['yearly_salary', 'pay_per_check', 'pay_frequency', 'retirement_401k', 'employer_401k_match',
+                'rent_mortgage', 'car_insurance', 'phone_bill', 'miscellaneous']
+
+# Direct dependencies of every field produced by calculate_budget, on inputs or on other derived fields.
+DERIVED_DEPENDENCIES = {
+    'retirement_401k_percent': ['retirement_401k'],
+    'employer_401k_match_percent': ['employer_401k_match'],
+    'monthly_income': ['pay_frequency', 'pay_per_check', 'yearly_salary'],
+    'monthly_401k_employee': ['pay_frequency', 'pay_per_check', 'retirement_401k_percent'],
+    'monthly_401k_employer': ['pay_frequency', 'pay_per_check', 'employer_401k_match_percent'],
+    'monthly_401k_total': ['monthly_401k_employee', 'monthly_401k_employer'],
+    'total_expenses': ['rent_mortgage', 'car_insurance', 'phone_bill', 'miscellaneous'],
+    'liquid_savings': ['monthly_income', 'total_expenses'],
+    'total_monthly_savings': ['liquid_savings', 'monthly_401k_total'],
+    'yearly_liquid_savings': ['liquid_savings'],
+    'yearly_401k_employee_savings': ['monthly_401k_employee'],
+    'yearly_401k_employer_savings': ['monthly_401k_employer'],
+    'yearly_401k_total_savings': ['monthly_401k_total'],
+    'yearly_total_savings': ['total_monthly_savings'],
+    'savings_rate': ['total_monthly_savings', 'monthly_income', 'monthly_401k_employer'],
+    'liquid_savings_rate': ['liquid_savings', 'monthly_income'],
+    'projections': ['yearly_liquid_savings', 'yearly_401k_employee_savings', 'yearly_401k_employer_savings',
+                    'yearly_401k_total_savings', 'yearly_total_savings'],
+    'expense_breakdown': ['rent_mortgage', 'car_insurance', 'phone_bill', 'miscellaneous', 'liquid_savings',
+                          'monthly_401k_employee', 'monthly_401k_employer', 'monthly_401k_total'],
+}
+
+# Calculation fields each chart in generate_charts reads.
+CHART_DEPENDENCIES = {
+    'expense_breakdown': ['expense_breakdown'],
+    'savings_projection': ['projections'],
+    '401k_breakdown': ['monthly_401k_total', 'monthly_401k_employee', 'monthly_401k_employer'],
+}
+
+def _dependents():
+    dependents = {}
+    for field, dependencies in DERIVED_DEPENDENCIES.items():
+        for dependency in dependencies:
+            dependents.setdefault(dependency, []).append(field)
+    return dependents
+
+_DEPENDENTS = _dependents()
+
+def affected_fields(changed):
+    affected = set()
+    stack = list(changed)
+    while stack:
+        for dependent in _DEPENDENTS.get(stack.pop(), []):
+            if dependent not in affected:
+                affected.add(dependent)
+                stack.append(dependent)
+    return affected
+
+def affected_charts(fields):
+    return {chart for chart, dependencies in CHART_DEPENDENCIES.items() if fields.intersection(dependencies)}
+
+def _normalize(field, value):
+    if field == 'pay_frequency':
+        return value
+    try:
+        return float(value) if value is not None and value != '' else 0.0
+    except (ValueError, TypeError):
+        return value
+
+def changed_inputs(old_data, new_data):
+    return {field for field in INPUT_FIELDS
+            if _normalize(field, old_data.get(field)) != _normalize(field, new_data.get(field))}
@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import g, request
+import serialization
+
+logger = logging.getLogger(__name__)
+
+class EndpointStats:
+    def __init__(self, window_seconds=60, max_samples=1000):
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, status_code, seconds):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    'requests': 0, 'errors': 0, 'recent': deque(maxlen=self.max_samples)
+                }
+            stats['requests'] += 1
+            if status_code >= 500:
+                stats['errors'] += 1
+            stats['recent'].append((time.monotonic(), seconds * 1000))
+
+    def sample(self):
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._endpoints.items():
+                latencies = sorted(ms for at, ms in stats['recent'] if at >= cutoff)
+                result[endpoint] = {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'requests_per_second': round(len(latencies) / self.window_seconds, 3),
+                    'avg_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+                    'p50_ms': round(latencies[len(latencies) // 2], 2) if latencies else None,
+                    'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2)
+                    if latencies else None
+                }
+            return {'window_seconds': self.window_seconds, 'endpoints': result}
+
+class HealthSampler:
+    def __init__(self, app, snapshot, interval=5, heartbeat=15):
+        self.app = app
+        self.snapshot = snapshot
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.subscribers = 0
+        self.samples_taken = 0
+        self.latest = None
+        self.sequence = 0
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    data = self.snapshot()
+            except Exception as e:
+                logger.error(f"Health sampler failed: {e}")
+                data = {'status': 'unhealthy', 'error': str(e), 'timestamp': datetime.now().isoformat()}
+            payload = serialization.dumps(data)
+            with self._condition:
+                self.sequence += 1
+                self.latest = payload
+                self.samples_taken += 1
+                self._condition.notify_all()
+                if not self.subscribers:
+                    self._thread = None
+                    return
+                self._condition.wait_for(lambda: not self.subscribers,
+                                         timeout=max(0.0, self.interval - (time.perf_counter() - started)))
+                if not self.subscribers:
+                    self._thread = None
+                    return
+
+    def subscribe(self):
+        with self._condition:
+            self.subscribers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='health-sampler', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self):
+        with self._condition:
+            self.subscribers -= 1
+            self._condition.notify_all()
+
+    def wait_for_sample(self, last_sequence, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self.sequence > last_sequence, timeout=timeout)
+            return self.sequence, self.latest
+
+    def events(self, last_event_id=None):
+        self.subscribe()
+        try:
+            yield f'retry: {int(self.interval * 1000)}\n\n'
+            with self._condition:
+                # Event IDs restart with the process; an ID from a previous run gets the latest sample.
+                sequence = last_event_id if last_event_id and last_event_id <= self.sequence else 0
+            while True:
+                # A reconnecting client whose Last-Event-ID is current waits for the next sample.
+                latest_sequence, payload = self.wait_for_sample(sequence, self.heartbeat)
+                if latest_sequence > sequence:
+                    sequence = latest_sequence
+                    yield f'id: {sequence}\nevent: health\ndata: {payload}\n\n'
+                else:
+                    yield ': heartbeat\n\n'
+        finally:
+            self.unsubscribe()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'subscribers': self.subscribers,
+                'interval': self.interval,
+                'heartbeat': self.heartbeat,
+                'samples_taken': self.samples_taken,
+                'running': self._thread is not None
+            }
+
+def init_app(app, snapshot):
+    endpoint_stats = EndpointStats(app.config['ENDPOINT_STATS_WINDOW'])
+    app.extensions['endpoint_stats'] = endpoint_stats
+    app.extensions['health_sampler'] = HealthSampler(
+        app, snapshot, app.config['HEALTH_STREAM_INTERVAL'], app.config['HEALTH_STREAM_HEARTBEAT']
+    )
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_timing(response):
+        started = g.pop('request_started', None)
+        if started is not None and request.endpoint:
+            endpoint_stats.record(request.endpoint, response.status_code, time.perf_counter() - started)
+        return response
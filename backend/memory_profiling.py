@@ -0,0 +1,242 @@
+import hmac
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from flask import Blueprint, current_app, g, jsonify, request
+
+admin = Blueprint('admin', __name__, url_prefix='/api/admin/memory')
+
+GROUP_BY_OPTIONS = ('lineno', 'filename', 'traceback')
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+class MemoryProfiler:
+    def __init__(self, max_snapshots=5):
+        self.max_snapshots = max_snapshots
+        self.snapshots = OrderedDict()
+        self.sample_requests = False
+        self.endpoint_peaks = {}
+        self.in_flight = 0
+        self.skipped_samples = 0
+        self.sample_settle_seconds = 1.0
+        self._sample_after = 0.0
+        self._sample_overlapped = False
+        self._next_snapshot_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1, sample_requests=False):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        if sample_requests and not self.sample_requests:
+            # Requests already running when sampling starts are not counted as in flight, so wait for them.
+            self._sample_after = time.monotonic() + self.sample_settle_seconds
+        self.sample_requests = sample_requests
+
+    def stop(self):
+        self.sample_requests = False
+        tracemalloc.stop()
+        with self._lock:
+            self.snapshots.clear()
+
+    def take_snapshot(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        with self._lock:
+            snapshot_id = self._next_snapshot_id
+            self._next_snapshot_id += 1
+            self.snapshots[snapshot_id] = (time.time(), snapshot)
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return snapshot_id, snapshot
+
+    def get_snapshot(self, snapshot_id):
+        with self._lock:
+            entry = self.snapshots.get(snapshot_id)
+        return entry[1] if entry else None
+
+    # tracemalloc's peak is process-wide, so a request is only sampled while no other request is in flight.
+    def begin_request(self):
+        with self._lock:
+            self.in_flight += 1
+            if not self.sample_requests or not tracemalloc.is_tracing():
+                return None
+            if self.in_flight > 1:
+                self._sample_overlapped = True
+                self.skipped_samples += 1
+                return None
+            if time.monotonic() < self._sample_after:
+                return None
+            self._sample_overlapped = False
+            tracemalloc.reset_peak()
+            return tracemalloc.get_traced_memory()[0]
+
+    def end_request(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_request(self, endpoint, start_bytes):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                return
+            if self._sample_overlapped:
+                self.skipped_samples += 1
+                return
+            peak_kb = (tracemalloc.get_traced_memory()[1] - start_bytes) / 1024
+            stats = self.endpoint_peaks.setdefault(endpoint, {'requests': 0, 'max_peak_kb': 0.0, 'total_peak_kb': 0.0})
+            stats['requests'] += 1
+            stats['max_peak_kb'] = max(stats['max_peak_kb'], peak_kb)
+            stats['total_peak_kb'] += peak_kb
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory() if self.tracing else (0, 0)
+        with self._lock:
+            snapshots = [{'id': snapshot_id, 'taken_at': taken_at} for snapshot_id, (taken_at, _) in self.snapshots.items()]
+            endpoints = {
+                endpoint: {
+                    'requests': stats['requests'],
+                    'max_peak_kb': round(stats['max_peak_kb'], 1),
+                    'avg_peak_kb': round(stats['total_peak_kb'] / stats['requests'], 1)
+                }
+                for endpoint, stats in self.endpoint_peaks.items()
+            }
+        return {
+            'tracing': self.tracing,
+            'frames': tracemalloc.get_traceback_limit() if self.tracing else None,
+            'traced_current_kb': round(current / 1024, 1),
+            'traced_peak_kb': round(peak / 1024, 1),
+            'sample_requests': self.sample_requests,
+            'skipped_samples': self.skipped_samples,
+            'snapshots': snapshots,
+            'endpoints': endpoints,
+            'matplotlib_figures': open_figures()
+        }
+
+def open_figures():
+    if 'matplotlib.pyplot' not in sys.modules:
+        return {'loaded': False, 'open': 0, 'figures': []}
+    from matplotlib._pylab_helpers import Gcf
+    figures = []
+    for manager in Gcf.get_all_fig_managers():
+        figure = manager.canvas.figure
+        width, height = figure.get_size_inches()
+        figures.append({'number': manager.num, 'axes': len(figure.axes), 'size_inches': [width, height]})
+    return {'loaded': True, 'open': len(figures), 'figures': figures}
+
+def _format_stat(stat, group_by):
+    frame = stat.traceback[0]
+    entry = {
+        'file': frame.filename,
+        'line': frame.lineno if group_by != 'filename' else None,
+        'size_kb': round(stat.size / 1024, 1),
+        'count': stat.count
+    }
+    if group_by == 'traceback':
+        entry['traceback'] = [f'{f.filename}:{f.lineno}' for f in stat.traceback]
+    if hasattr(stat, 'size_diff'):
+        entry['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+        entry['count_diff'] = stat.count_diff
+    return entry
+
+def _profiler():
+    return current_app.extensions['memory_profiler']
+
+def _query_options():
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in GROUP_BY_OPTIONS:
+        return None, None
+    return group_by, request.args.get('limit', 20, type=int)
+
+@admin.before_request
+def require_admin_token():
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode(), current_app.config['ADMIN_TOKEN'].encode()):
+        return jsonify({'error': 'Admin token required'}), 403
+
+@admin.route('', methods=['GET'])
+def memory_status():
+    return jsonify(_profiler().status())
+
+@admin.route('/start', methods=['POST'])
+def start_tracing():
+    data = request.get_json(silent=True) or {}
+    frames = int(data.get('frames', 1))
+    if not 1 <= frames <= 50:
+        return jsonify({'error': 'frames must be between 1 and 50'}), 400
+    _profiler().start(frames, bool(data.get('sample_requests', False)))
+    return jsonify(_profiler().status())
+
+@admin.route('/stop', methods=['POST'])
+def stop_tracing():
+    _profiler().stop()
+    return jsonify(_profiler().status())
+
+@admin.route('/snapshots', methods=['POST'])
+def take_snapshot():
+    profiler = _profiler()
+    if not profiler.tracing:
+        return jsonify({'error': 'Tracing is not enabled'}), 409
+    group_by, limit = _query_options()
+    if group_by is None:
+        return jsonify({'error': f"group_by must be one of {', '.join(GROUP_BY_OPTIONS)}"}), 400
+    snapshot_id, snapshot = profiler.take_snapshot()
+    return jsonify({
+        'id': snapshot_id,
+        'top': [_format_stat(stat, group_by) for stat in snapshot.statistics(group_by)[:limit]],
+        'matplotlib_figures': open_figures()
+    })
+
+@admin.route('/diff', methods=['GET'])
+def diff_snapshots():
+    profiler = _profiler()
+    group_by, limit = _query_options()
+    if group_by is None:
+        return jsonify({'error': f"group_by must be one of {', '.join(GROUP_BY_OPTIONS)}"}), 400
+    snapshot_ids = list(profiler.snapshots)
+    older_id = request.args.get('from', snapshot_ids[-2] if len(snapshot_ids) > 1 else None, type=int)
+    newer_id = request.args.get('to', snapshot_ids[-1] if snapshot_ids else None, type=int)
+    older = profiler.get_snapshot(older_id)
+    newer = profiler.get_snapshot(newer_id)
+    if older is None or newer is None:
+        return jsonify({'error': 'Two stored snapshots are required', 'snapshots': snapshot_ids}), 404
+    stats = newer.compare_to(older, group_by)
+    return jsonify({
+        'from': older_id,
+        'to': newer_id,
+        'total_size_diff_kb': round(sum(stat.size_diff for stat in stats) / 1024, 1),
+        'top': [_format_stat(stat, group_by) for stat in stats[:limit]]
+    })
+
+def init_app(app):
+    if not app.config.get('ADMIN_TOKEN'):
+        return
+    profiler = MemoryProfiler(app.config['MEMORY_MAX_SNAPSHOTS'])
+    app.extensions['memory_profiler'] = profiler
+    app.register_blueprint(admin)
+
+    @app.before_request
+    def start_request_sample():
+        # Unlocked check, so requests never touch the profiler's lock while sampling is off.
+        if profiler.sample_requests:
+            g.memory_request_counted = True
+            g.memory_sample_start = profiler.begin_request()
+
+    @app.after_request
+    def record_request_sample(response):
+        start = g.pop('memory_sample_start', None)
+        if start is not None:
+            profiler.record_request(request.endpoint, start)
+        return response
+
+    @app.teardown_request
+    def finish_request_sample(exception=None):
+        if g.pop('memory_request_counted', False):
+            profiler.end_request()
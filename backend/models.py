@@ -1,9 +1,49 @@
 from flask_sqlalchemy import SQLAlchemy
+from dataclasses import dataclass, fields
 from datetime import datetime
-import json
+import serialization
 
 db = SQLAlchemy()
 
+@dataclass(slots=True)
+class BudgetCalculation:
+    monthly_income: float
+    total_expenses: float
+    liquid_savings: float
+    monthly_401k_employee: float
+    monthly_401k_employer: float
+    monthly_401k_total: float
+    total_monthly_savings: float
+    yearly_liquid_savings: float
+    yearly_401k_employee_savings: float
+    yearly_401k_employer_savings: float
+    yearly_401k_total_savings: float
+    yearly_total_savings: float
+    savings_rate: float
+    liquid_savings_rate: float
+    projections: dict
+    expense_breakdown: dict
+    retirement_401k_percent: float
+    employer_401k_match_percent: float
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return [field.name for field in fields(self)]
+
+    def to_dict(self):
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
 class Budget(db.Model):
 
     __tablename__ = 'budgets'
@@ -13,22 +53,34 @@ class Budget(db.Model):
     calculations = db.Column(db.Text, nullable=False)
     charts = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    idempotency_key = db.Column(db.String(255), nullable=True, unique=True, index=True)
+    request_hash = db.Column(db.String(64), nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    recommendations = db.Column(db.Text, nullable=True)
+    recommendations_version = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_budgets_request_hash_created_at', 'request_hash', 'created_at'),
+        db.Index('ix_budgets_name_trgm_gist', 'name', postgresql_using='gist', postgresql_ops={'name': 'gist_trgm_ops'}),
+    )
 
-    def __init__(self, name, input_data, calculations, charts=None):
+    def __init__(self, name, input_data, calculations, charts=None, idempotency_key=None, request_hash=None):
         self.name = name
         self.input_data = input_data
         self.calculations = calculations
         self.charts = charts
+        self.idempotency_key = idempotency_key
+        self.request_hash = request_hash
 
     def __repr__(self):
         return f'<Budget {self.id}: {self.name}>'
-    
-    def to_dict(self):
+
+    def to_dict(self, input_data=None, calculations=None, charts=None):
         try:
-            input_data_dict = json.loads(self.input_data) if self.input_data else {}
-            calculations_dict = json.loads(self.calculations) if self.calculations else {}
-            charts_dict = json.loads(self.charts) if self.charts else {}
-        except json.JSONDecodeError:
+            input_data_dict = input_data if input_data is not None else (serialization.loads(self.input_data) if self.input_data else {})
+            calculations_dict = calculations if calculations is not None else (serialization.loads(self.calculations) if self.calculations else {})
+            charts_dict = charts if charts is not None else (serialization.loads(self.charts) if self.charts else {})
+        except ValueError:
             input_data_dict = {}
             calculations_dict = {}
             charts_dict = {}
@@ -38,5 +90,29 @@ class Budget(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'input_data': input_data_dict,
             'calculations': calculations_dict,
-            'charts': charts_dict
+            'charts': charts_dict,
+            'version': self.version or 1
         }
+
+    @property
+    def etag(self):
+        return f'{self.id}-{self.version or 1}'
+
+def init_schema():
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.begin() as connection:
+            connection.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    db.create_all()
+    inspector = db.inspect(db.engine)
+    table = Budget.__table__
+    existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+    with db.engine.begin() as connection:
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                column_default = f' DEFAULT {column.server_default.arg}' if column.server_default is not None else ''
+                connection.execute(db.text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{column_default}'
+                ))
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
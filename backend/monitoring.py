@@ -2,7 +2,6 @@ import time
 import logging
 from functools import wraps
 from flask import request, g
-import psutil
 import os
 
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +12,7 @@ def monitor_performance(f):
     def decorated_function(*args, **kwargs):
         start_time = time.time()
         g.start_time = start_time
+        import psutil
         process = psutil.Process(os.getpid())
         memory_before = process.memory_info().rss / 1024 / 1024
         try:
@@ -36,6 +36,7 @@ def monitor_performance(f):
     return decorated_function
 
 def get_system_stats():
+    import psutil
     memory = psutil.virtual_memory()
     cpu_percent = psutil.cpu_percent(interval=1)
     return {
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from models import db, Budget
+import serialization
+
+logger = logging.getLogger(__name__)
+
+def _share_of_income(amount, calc):
+    income = calc.get('monthly_income') or 0
+    if amount is None or income <= 0:
+        return None
+    return amount / income * 100
+
+# Metric name -> (extractor over a stored calculations dict, whether a higher value is better).
+RANK_METRICS = {
+    'savings_rate': (lambda calc: calc.get('savings_rate'), True),
+    'liquid_savings_rate': (lambda calc: calc.get('liquid_savings_rate'), True),
+    'monthly_income': (lambda calc: calc.get('monthly_income'), True),
+    'expense_ratio': (lambda calc: _share_of_income(calc.get('total_expenses'), calc), False),
+    'housing_ratio': (lambda calc: _share_of_income(calc.get('expense_breakdown', {}).get('rent_mortgage'), calc), False),
+}
+
+def metric_values(calc):
+    values = {}
+    for metric, (extract, _) in RANK_METRICS.items():
+        value = extract(calc)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[metric] = float(value)
+    return values
+
+class PercentileIndex:
+    def __init__(self, rebuild_interval=300):
+        self.rebuild_interval = rebuild_interval
+        self._sorted = {metric: [] for metric in RANK_METRICS}
+        self._values = {}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._pending = None
+        self.built_at = None
+        self.build_seconds = None
+        self.updates_since_build = 0
+        self.rebuilding = False
+
+    def _insert(self, sorted_values, values, budget_id, metrics):
+        self._discard(sorted_values, values, budget_id)
+        values[budget_id] = metrics
+        for metric, value in metrics.items():
+            insort(sorted_values[metric], value)
+
+    def _discard(self, sorted_values, values, budget_id):
+        for metric, value in values.pop(budget_id, {}).items():
+            column = sorted_values[metric]
+            position = bisect_left(column, value)
+            if position < len(column) and column[position] == value:
+                del column[position]
+
+    def upsert(self, budget_id, calc):
+        metrics = metric_values(calc)
+        with self._lock:
+            self._insert(self._sorted, self._values, budget_id, metrics)
+            self.updates_since_build += 1
+            if self._pending is not None:
+                self._pending.append((budget_id, metrics))
+
+    def remove(self, budget_id):
+        with self._lock:
+            self._discard(self._sorted, self._values, budget_id)
+            self.updates_since_build += 1
+            if self._pending is not None:
+                self._pending.append((budget_id, None))
+
+    def rebuild(self):
+        start = time.perf_counter()
+        with self._lock:
+            self._pending = []
+        try:
+            values = {}
+            columns = {metric: [] for metric in RANK_METRICS}
+            rows = db.session.query(Budget.id, Budget.calculations).yield_per(1000)
+            for budget_id, calculations in rows:
+                try:
+                    metrics = metric_values(serialization.loads(calculations) if calculations else {})
+                except ValueError:
+                    continue
+                values[budget_id] = metrics
+                for metric, value in metrics.items():
+                    columns[metric].append(value)
+            for column in columns.values():
+                column.sort()
+            with self._lock:
+                # Replay writes that landed while the table was being read.
+                for budget_id, metrics in self._pending:
+                    if metrics is None:
+                        self._discard(columns, values, budget_id)
+                    else:
+                        self._insert(columns, values, budget_id, metrics)
+                self._sorted, self._values = columns, values
+                self.built_at = time.time()
+                self.build_seconds = round(time.perf_counter() - start, 3)
+                self.updates_since_build = 0
+        finally:
+            with self._lock:
+                self._pending = None
+                self.rebuilding = False
+
+    def ensure_fresh(self, app):
+        if self.built_at is None:
+            with self._build_lock:
+                if self.built_at is None:
+                    with self._lock:
+                        self.rebuilding = True
+                    self.rebuild()
+            return
+        with self._lock:
+            if self.rebuilding or self.age_seconds() < self.rebuild_interval:
+                return
+            self.rebuilding = True
+
+        def rebuild_in_background():
+            try:
+                with app.app_context():
+                    self.rebuild()
+            except Exception as e:
+                logger.error(f"Percentile index rebuild failed: {e}")
+
+        threading.Thread(target=rebuild_in_background, name='percentile-index-rebuild', daemon=True).start()
+
+    def age_seconds(self):
+        return time.time() - self.built_at if self.built_at is not None else None
+
+    def metrics_for(self, budget_id):
+        with self._lock:
+            return self._values.get(budget_id)
+
+    def percentiles(self, metrics):
+        result = {}
+        with self._lock:
+            for metric, value in metrics.items():
+                column = self._sorted[metric]
+                below = bisect_left(column, value)
+                equal = bisect_right(column, value) - below
+                percentile = (below + equal / 2) / len(column) * 100 if column else None
+                result[metric] = {
+                    'value': value,
+                    'percentile': round(percentile, 1) if percentile is not None else None,
+                    'population': len(column),
+                    'higher_is_better': RANK_METRICS[metric][1]
+                }
+        return result
+
+    def status(self):
+        with self._lock:
+            age = self.age_seconds()
+            return {
+                'population': len(self._values),
+                'built_at': datetime.fromtimestamp(self.built_at).isoformat() if self.built_at else None,
+                'age_seconds': round(age, 1) if age is not None else None,
+                'build_seconds': self.build_seconds,
+                'rebuild_interval': self.rebuild_interval,
+                'updates_since_build': self.updates_since_build,
+                'rebuilding': self.rebuilding,
+                'stale': age is None or age >= self.rebuild_interval
+            }
+
+def init_app(app):
+    app.extensions['percentile_index'] = PercentileIndex(app.config['RANK_REBUILD_INTERVAL'])
@@ -1,7 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
-from datetime import datetime
-from models import db, Budget
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, Budget, BudgetCalculation
+from comparison import compare_budgets, generate_comparison_chart
+from admission import Overloaded
+from charting import encode_chart
+from ranking import metric_values
+from dependencies import (INPUT_FIELDS, DERIVED_DEPENDENCIES, affected_fields,
+                          affected_charts, changed_inputs)
+import serialization
+import startup
+import svg_charts
+import base64
+import hashlib
 import json
+import threading
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
@@ -91,39 +105,28 @@ def calculate_budget(data):
     gross_monthly_income = monthly_income + monthly_401k_employer
     savings_rate = (total_monthly_savings / gross_monthly_income) * 100 if gross_monthly_income > 0 else 0
     liquid_savings_rate = (liquid_savings / monthly_income) * 100 if monthly_income > 0 else 0
-    return {
-        'monthly_income': monthly_income,
-        'total_expenses': total_expenses,
-        'liquid_savings': liquid_savings,
-        'monthly_401k_employee': monthly_401k_employee,
-        'monthly_401k_employer': monthly_401k_employer,
-        'monthly_401k_total': monthly_401k_total,
-        'total_monthly_savings': total_monthly_savings,
-        'yearly_liquid_savings': yearly_liquid_savings,
-        'yearly_401k_employee_savings': yearly_401k_employee_savings,
-        'yearly_401k_employer_savings': yearly_401k_employer_savings,
-        'yearly_401k_total_savings': yearly_401k_total_savings,
-        'yearly_total_savings': yearly_total_savings,
-        'savings_rate': savings_rate,
-        'liquid_savings_rate': liquid_savings_rate,
-        'projections': projections,
-        'expense_breakdown': expense_breakdown,
-        'retirement_401k_percent': retirement_401k_percent,
-        'employer_401k_match_percent': employer_401k_match_percent
-    }
+    return BudgetCalculation(
+        monthly_income=monthly_income,
+        total_expenses=total_expenses,
+        liquid_savings=liquid_savings,
+        monthly_401k_employee=monthly_401k_employee,
+        monthly_401k_employer=monthly_401k_employer,
+        monthly_401k_total=monthly_401k_total,
+        total_monthly_savings=total_monthly_savings,
+        yearly_liquid_savings=yearly_liquid_savings,
+        yearly_401k_employee_savings=yearly_401k_employee_savings,
+        yearly_401k_employer_savings=yearly_401k_employer_savings,
+        yearly_401k_total_savings=yearly_401k_total_savings,
+        yearly_total_savings=yearly_total_savings,
+        savings_rate=savings_rate,
+        liquid_savings_rate=liquid_savings_rate,
+        projections=projections,
+        expense_breakdown=expense_breakdown,
+        retirement_401k_percent=retirement_401k_percent,
+        employer_401k_match_percent=employer_401k_match_percent
+    )
 
-def generate_charts(budget_calc, budget_id):
-    import matplotlib
-    matplotlib.use('Agg')  
-    import matplotlib.pyplot as plt
-    import seaborn as sns
-    import base64
-    from io import BytesIO
-    import numpy as np
-
-    charts = {}
-    plt.style.use('seaborn-v0_8')
-    sns.set_palette("husl")
+def render_expense_breakdown_chart(budget_calc, plt, sns, np):
     fig, ax = plt.subplots(figsize=(10, 8))
     expenses = budget_calc['expense_breakdown']
     labels = ['Rent/Mortgage', 'Car Insurance', 'Phone Bill', 'Miscellaneous', 'Liquid Savings']
@@ -153,13 +156,9 @@ def generate_charts(budget_calc, budget_id):
 
     ax.set_title(f'Monthly Budget Breakdown - ${sum(values):,.2f}', 
                  fontsize=16, fontweight='bold', pad=20)
-    buffer = BytesIO()
-    plt.tight_layout()
-    plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-    buffer.seek(0)
-    chart_image = base64.b64encode(buffer.getvalue()).decode()
-    plt.close()
-    charts['expense_breakdown'] = chart_image
+    return encode_chart(plt)
+
+def render_savings_projection_chart(budget_calc, plt, sns, np):
     fig, ax = plt.subplots(figsize=(12, 8))
     years = [1, 2, 10]
     liquid_savings = [budget_calc['projections']['1_year']['liquid'],
@@ -192,144 +191,573 @@ def generate_charts(budget_calc, budget_id):
     ax.legend()
     ax.grid(True, alpha=0.3)
     ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-    buffer = BytesIO()
-    plt.tight_layout()
-    plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-    buffer.seek(0)
-    chart_image = base64.b64encode(buffer.getvalue()).decode()
-    plt.close()
-    charts['savings_projection'] = chart_image
-
-    if budget_calc['monthly_401k_total'] > 0:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        categories = []
-        amounts = []
-
-        if budget_calc['monthly_401k_employee'] > 0:
-            categories.append('Your Contributions')
-            amounts.append(budget_calc['monthly_401k_employee'])
-
-        if budget_calc['monthly_401k_employer'] > 0:
-            categories.append('Employer Match')
-            amounts.append(budget_calc['monthly_401k_employer'])
-        colors = sns.color_palette("Set2", len(categories))
-        bars = ax.bar(categories, amounts, color=colors, alpha=0.8)
+    return encode_chart(plt)
 
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'${height:,.2f}',
-                    ha='center', va='bottom', fontweight='bold', fontsize=12)
-            
-        ax.set_ylabel('Monthly Amount ($)', fontsize=12, fontweight='bold')
-        ax.set_title('Monthly 401k Contributions Breakdown', fontsize=16, fontweight='bold', pad=20)
-        ax.grid(True, alpha=0.3)
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-        buffer = BytesIO()
-        plt.tight_layout()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        chart_image = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        charts['401k_breakdown'] = chart_image
+def render_401k_breakdown_chart(budget_calc, plt, sns, np):
+    if budget_calc['monthly_401k_total'] <= 0:
+        return None
+    fig, ax = plt.subplots(figsize=(10, 6))
+    categories = []
+    amounts = []
+
+    if budget_calc['monthly_401k_employee'] > 0:
+        categories.append('Your Contributions')
+        amounts.append(budget_calc['monthly_401k_employee'])
+
+    if budget_calc['monthly_401k_employer'] > 0:
+        categories.append('Employer Match')
+        amounts.append(budget_calc['monthly_401k_employer'])
+    colors = sns.color_palette("Set2", len(categories))
+    bars = ax.bar(categories, amounts, color=colors, alpha=0.8)
+
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'${height:,.2f}',
+                ha='center', va='bottom', fontweight='bold', fontsize=12)
+        
+    ax.set_ylabel('Monthly Amount ($)', fontsize=12, fontweight='bold')
+    ax.set_title('Monthly 401k Contributions Breakdown', fontsize=16, fontweight='bold', pad=20)
+    ax.grid(True, alpha=0.3)
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+    return encode_chart(plt)
+
+CHART_RENDERERS = {
+    'expense_breakdown': render_expense_breakdown_chart,
+    'savings_projection': render_savings_projection_chart,
+    '401k_breakdown': render_401k_breakdown_chart,
+}
+
+CHART_FORMATS = ('png', 'svg', 'svg-png')
+
+def generate_charts(budget_calc, budget_id, only=None, chart_format='png'):
+    if chart_format != 'png':
+        return svg_charts.generate_svg_charts(budget_calc, only, rasterize=chart_format == 'svg-png')
+    plt, sns, np = startup.load_chart_stack()
+
+    charts = {}
+    plt.style.use('seaborn-v0_8')
+    sns.set_palette("husl")
+    for name, renderer in CHART_RENDERERS.items():
+        if only is not None and name not in only:
+            continue
+        chart_image = renderer(budget_calc, plt, sns, np)
+        if chart_image is not None:
+            charts[name] = chart_image
     return charts
 
+REQUIRED_FIELDS = ['yearly_salary', 'pay_per_check', 'pay_frequency', 
+                   'rent_mortgage', 'car_insurance', 'phone_bill', 'miscellaneous']
+NUMERIC_FIELDS = ['yearly_salary', 'pay_per_check', 'rent_mortgage', 
+                  'car_insurance', 'phone_bill', 'miscellaneous', 'retirement_401k', 'employer_401k_match']
+
+def validate_budget_input(data):
+    for field in REQUIRED_FIELDS:
+        if field not in data or data[field] == '':
+            return {'error': f'Missing required field: {field}'}
+
+    validation_errors = {}
+    for field in NUMERIC_FIELDS:
+        if field in data and data[field] != '' and data[field] is not None:
+            try:
+                value = float(data[field])
+                if value < 0:
+                    validation_errors[field] = 'Value must be positive'
+                elif field in ['retirement_401k', 'employer_401k_match'] and value > 100:
+                    validation_errors[field] = 'Percentage cannot exceed 100%'
+            except (ValueError, TypeError):
+                validation_errors[field] = 'Must be a valid number'
+
+    if validation_errors:
+        return {
+            'error': 'Invalid input values',
+            'validation_errors': validation_errors
+        }
+    return None
+
+def build_input_data(data):
+    pay_per_check = float(data['pay_per_check'])
+    retirement_401k_value = data.get('retirement_401k')
+    employer_401k_match_value = data.get('employer_401k_match')
+    retirement_401k_percent = float(retirement_401k_value) if retirement_401k_value and retirement_401k_value != '' else 0.0
+    employer_401k_match_percent = float(employer_401k_match_value) if employer_401k_match_value and employer_401k_match_value != '' else 0.0
+    input_data_dict = dict(data)
+    input_data_dict['retirement_401k_percent'] = retirement_401k_percent
+    input_data_dict['employer_401k_match_percent'] = employer_401k_match_percent
+    input_data_dict['retirement_401k_amount_per_paycheck'] = pay_per_check * (retirement_401k_percent / 100)
+    input_data_dict['employer_401k_match_amount_per_paycheck'] = pay_per_check * (employer_401k_match_percent / 100)
+    return input_data_dict
+
+def admission_slot(name, chart_format='png'):
+    if chart_format == 'svg':
+        return nullcontext()
+    return current_app.extensions['admission'][name].slot()
+
+def requested_chart_format():
+    chart_format = request.args.get('chart_format', current_app.config['CHART_FORMAT']).lower()
+    if chart_format not in CHART_FORMATS:
+        return None, (jsonify({'error': f"chart_format must be one of {', '.join(CHART_FORMATS)}"}), 400)
+    if chart_format == 'svg-png' and not svg_charts.rasterize_available():
+        return None, (jsonify({'error': 'chart_format svg-png requires cairosvg to be installed'}), 400)
+    return chart_format, None
+
+def charts_in_format(charts, chart_format):
+    return all(svg_charts.is_svg(chart) == (chart_format == 'svg') for chart in charts.values())
+
+def overloaded_response(error):
+    response = jsonify({
+        'error': 'Server is busy rendering charts. Please retry shortly.',
+        'endpoint_class': error.name,
+        'reason': error.reason
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(current_app.config['OVERLOAD_RETRY_AFTER'])
+    return response
+
+def canonical_request_hash(data):
+    # calculate_budget matches pay_frequency exactly, so it is hashed as sent.
+    normalized = {'pay_frequency': data.get('pay_frequency')}
+    for field in NUMERIC_FIELDS:
+        value = data.get(field)
+        normalized[field] = float(value) if value is not None and value != '' else 0.0
+    name = data.get('name')
+    if name:
+        normalized['name'] = str(name).strip()
+    canonical = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def find_existing_budget(idempotency_key, request_hash):
+    if idempotency_key:
+        budget = Budget.query.filter_by(idempotency_key=idempotency_key).first()
+        if budget is not None:
+            return budget
+    window = current_app.config.get('DEDUP_WINDOW_SECONDS', 0)
+    if window > 0:
+        cutoff = datetime.utcnow() - timedelta(seconds=window)
+        return (Budget.query
+                .filter(Budget.request_hash == request_hash, Budget.created_at >= cutoff)
+                .order_by(Budget.created_at.desc())
+                .first())
+    return None
+
+DEDUP_LOCKS = [threading.Lock() for _ in range(64)]
+
+@contextmanager
+def dedup_lock(request_hash):
+    if current_app.config.get('DEDUP_WINDOW_SECONDS', 0) <= 0:
+        yield
+        return
+    if db.engine.dialect.name == 'postgresql':
+        # Released when the transaction that inserts (or replays) the budget ends.
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(:key)'), {'key': int(request_hash[:15], 16)})
+        yield
+        return
+    # Without advisory locks, identical requests are only serialized within this process.
+    with DEDUP_LOCKS[int(request_hash[:8], 16) % len(DEDUP_LOCKS)]:
+        yield
+
+def replay_budget(budget):
+    response = jsonify(budget.to_dict())
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def create_budget(data, chart_format, idempotency_key, request_hash):
+    existing = find_existing_budget(idempotency_key, request_hash)
+    if existing is not None:
+        if existing.idempotency_key == idempotency_key and existing.request_hash != request_hash:
+            return jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422
+        return replay_budget(existing)
+    try:
+        budget_calc = calculate_budget(data)
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'validation_errors': {'general': 'Invalid numeric values provided'}
+        }), 400
+    
+    input_data_dict = build_input_data(data)
+    budget_entry = Budget(
+        name=data.get('name', f"Budget {datetime.now().strftime('%Y-%m-%d %H:%M')}"),
+        input_data=serialization.dumps(input_data_dict),
+        calculations=serialization.dumps(budget_calc),
+        idempotency_key=idempotency_key,
+        request_hash=request_hash
+    )
+    charts_deferred = False
+    try:
+        with admission_slot('chart_render', chart_format):
+            charts = generate_charts(budget_calc, str(budget_entry.id), chart_format=chart_format)
+    except Overloaded as e:
+        if not current_app.config['DEGRADED_MODE']:
+            return overloaded_response(e)
+        charts, charts_deferred = {}, True
+    budget_entry.charts = None if charts_deferred else serialization.dumps(charts)
+    recommendations_body = precompute_recommendations(budget_entry, budget_calc, input_data_dict)
+    db.session.add(budget_entry)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        existing = find_existing_budget(idempotency_key, request_hash)
+        if existing is None:
+            raise
+        return replay_budget(existing)
+    if recommendations_body is not None:
+        _recommendations_cache().set((budget_entry.id, RECOMMENDATION_RULES_VERSION), recommendations_body)
+    _percentile_index().upsert(budget_entry.id, budget_calc)
+    response = jsonify(budget_entry.to_dict(input_data=input_data_dict, calculations=budget_calc, charts=charts))
+    if charts_deferred:
+        response.headers['X-Charts-Deferred'] = 'true'
+    return response
+
 @api.route('/calculate', methods=['POST'])
 def calculate_budget_route():
     try:
         data = request.json
-        required_fields = ['yearly_salary', 'pay_per_check', 'pay_frequency', 
-                          'rent_mortgage', 'car_insurance', 'phone_bill', 'miscellaneous']
-        
-        for field in required_fields:
-            if field not in data or data[field] == '':
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-            
-        numeric_fields = ['yearly_salary', 'pay_per_check', 'rent_mortgage', 
-                         'car_insurance', 'phone_bill', 'miscellaneous', 'retirement_401k', 'employer_401k_match']
-        validation_errors = {}
+        validation_error = validate_budget_input(data)
+        if validation_error is not None:
+            return jsonify(validation_error), 400
+        chart_format, format_error = requested_chart_format()
+        if format_error is not None:
+            return format_error
 
-        for field in numeric_fields:
-            if field in data and data[field] != '' and data[field] is not None:
-                try:
-                    value = float(data[field])
-                    if value < 0:
-                        validation_errors[field] = 'Value must be positive'
-                    elif field in ['retirement_401k', 'employer_401k_match'] and value > 100:
-                        validation_errors[field] = 'Percentage cannot exceed 100%'
-                except (ValueError, TypeError):
-                    validation_errors[field] = 'Must be a valid number'
-
-        if validation_errors:
-            return jsonify({
-                'error': 'Invalid input values',
-                'validation_errors': validation_errors
-            }), 400
-        try:
-            budget_calc = calculate_budget(data)
-        except ValueError as e:
-            return jsonify({
-                'error': str(e),
-                'validation_errors': {'general': 'Invalid numeric values provided'}
-            }), 400
-        
-        pay_per_check = float(data['pay_per_check'])
-        retirement_401k_value = data.get('retirement_401k')
-        employer_401k_match_value = data.get('employer_401k_match')
-        retirement_401k_percent = float(retirement_401k_value) if retirement_401k_value and retirement_401k_value != '' else 0.0
-        employer_401k_match_percent = float(employer_401k_match_value) if employer_401k_match_value and employer_401k_match_value != '' else 0.0
-        budget_entry = Budget(
-            name=data.get('name', f"Budget {datetime.now().strftime('%Y-%m-%d %H:%M')}"),
-            input_data=json.dumps(data),
-            calculations=json.dumps(budget_calc)
-        )
-        input_data_dict = dict(data)
-        input_data_dict['retirement_401k_percent'] = retirement_401k_percent
-        input_data_dict['employer_401k_match_percent'] = employer_401k_match_percent
-        input_data_dict['retirement_401k_amount_per_paycheck'] = pay_per_check * (retirement_401k_percent / 100)
-        input_data_dict['employer_401k_match_amount_per_paycheck'] = pay_per_check * (employer_401k_match_percent / 100)
-        budget_entry.input_data = json.dumps(input_data_dict)
-        charts = generate_charts(budget_calc, str(budget_entry.id))
-        budget_entry.charts = json.dumps(charts)
-        db.session.add(budget_entry)
-        db.session.commit()
-        return jsonify(budget_entry.to_dict())
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= 255:
+            return jsonify({'error': 'Idempotency-Key must be between 1 and 255 characters'}), 400
+        request_hash = canonical_request_hash(data)
+        with dedup_lock(request_hash):
+            return create_budget(data, chart_format, idempotency_key, request_hash)
     except Exception as e:
         import traceback
         print(f"DEBUG: Exception occurred: {str(e)}")
         print(f"DEBUG: Traceback: {traceback.format_exc()}")
         return jsonify({'error': str(e)}), 500
     
+def budget_summary(budget):
+    calc = serialization.loads(budget.calculations)
+    liquid_savings = calc.get('liquid_savings', calc.get('monthly_savings', 0))
+    monthly_401k_employee = calc.get('monthly_401k_employee', 0)
+    monthly_401k_employer = calc.get('monthly_401k_employer', 0)
+    monthly_401k_total = calc.get('monthly_401k_total', monthly_401k_employee + monthly_401k_employer)
+    total_monthly_savings = calc.get('total_monthly_savings', liquid_savings + monthly_401k_total)
+    return {
+        'id': budget.id,
+        'name': budget.name,
+        'created_at': budget.created_at.isoformat(),
+        'liquid_savings': liquid_savings,
+        'monthly_401k_employee': monthly_401k_employee,
+        'monthly_401k_employer': monthly_401k_employer,
+        'monthly_401k_total': monthly_401k_total,
+        'total_monthly_savings': total_monthly_savings,
+        'savings_rate': calc.get('savings_rate', 0),
+        'monthly_income': calc.get('monthly_income', 0)
+    }
+
+SUMMARY_COLUMNS = (Budget.id, Budget.name, Budget.created_at, Budget.calculations)
+MAX_PAGE_SIZE = 100
+MIN_SEARCH_LENGTH = 3
+MAX_SEARCH_LENGTH = 100
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size or not all(
+            isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        raise ValueError('Invalid cursor')
+    return values
+
+def page_size():
+    limit = request.args.get('limit', type=int)
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+def paginated_response(items, limit, cursor_for):
+    response = jsonify(items[:limit])
+    if len(items) > limit:
+        response.headers['X-Next-Cursor'] = cursor_for(items[limit - 1])
+    return response
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_distance(term):
+    if db.engine.dialect.name == 'postgresql':
+        # Trigram distance; ordering by it is a KNN scan of the GiST index that stops after the page.
+        return Budget.name.op('<->')(term)
+    return db.cast(1.0 - len(term) * 1.0 / db.func.length(Budget.name), db.Float)
+
 @api.route('/budgets', methods=['GET'])
 def get_budgets():
     try:
-        budgets = Budget.query.all()
-        summary_budgets = []
-
-        for budget in budgets:
-            calc = json.loads(budget.calculations)
-            liquid_savings = calc.get('liquid_savings', calc.get('monthly_savings', 0))
-            monthly_401k_employee = calc.get('monthly_401k_employee', 0)
-            monthly_401k_employer = calc.get('monthly_401k_employer', 0)
-            monthly_401k_total = calc.get('monthly_401k_total', monthly_401k_employee + monthly_401k_employer)
-            total_monthly_savings = calc.get('total_monthly_savings', liquid_savings + monthly_401k_total)
-            summary_budgets.append({
-                'id': budget.id,
-                'name': budget.name,
-                'created_at': budget.created_at.isoformat(),
-                'liquid_savings': liquid_savings,
-                'monthly_401k_employee': monthly_401k_employee,
-                'monthly_401k_employer': monthly_401k_employer,
-                'monthly_401k_total': monthly_401k_total,
-                'total_monthly_savings': total_monthly_savings,
-                'savings_rate': calc.get('savings_rate', 0),
-                'monthly_income': calc.get('monthly_income', 0)
-            })
-        return jsonify(summary_budgets)
+        try:
+            limit = page_size()
+            cursor = request.args.get('cursor')
+            last_id = decode_cursor(cursor, 1)[0] if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        query = db.session.query(*SUMMARY_COLUMNS)
+        if limit is None and last_id is None:
+            return jsonify([budget_summary(budget) for budget in query])
+        if last_id is not None:
+            query = query.filter(Budget.id < last_id)
+        limit = limit or 20
+        rows = query.order_by(Budget.id.desc()).limit(limit + 1).all()
+        return paginated_response([budget_summary(row) for row in rows], limit,
+                                  lambda item: encode_cursor([item['id']]))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
-@api.route('/budget/<int:budget_id>', methods=['GET', 'DELETE'])
+
+@api.route('/budgets/search', methods=['GET'])
+def search_budgets():
+    try:
+        term = request.args.get('q', '').strip().lower()
+        if not term:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        if not MIN_SEARCH_LENGTH <= len(term) <= MAX_SEARCH_LENGTH:
+            return jsonify({
+                'error': f'q must be between {MIN_SEARCH_LENGTH} and {MAX_SEARCH_LENGTH} characters'
+            }), 400
+        try:
+            limit = page_size() or 20
+            cursor = request.args.get('cursor')
+            last_distance, last_id = decode_cursor(cursor, 2) if cursor else (None, None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        distance = search_distance(term)
+        query = (db.session.query(*SUMMARY_COLUMNS, distance.label('distance'))
+                 .filter(Budget.name.ilike(f'%{escape_like(term)}%', escape='\\')))
+        if last_id is not None:
+            query = query.filter(db.or_(distance > last_distance,
+                                        db.and_(distance == last_distance, Budget.id < last_id)))
+        rows = query.order_by(distance, Budget.id.desc()).limit(limit + 1).all()
+        results = [{**budget_summary(row), 'distance': row.distance} for row in rows]
+        return paginated_response(results, limit, lambda item: encode_cursor([item['distance'], item['id']]))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Columns each sparse fieldset of /budgets/bulk needs on top of id, name, created_at and version.
+BULK_INCLUDES = {
+    'input_data': (Budget.input_data,),
+    'calculations': (Budget.calculations,),
+    'charts': (Budget.charts,),
+    'recommendations': (Budget.recommendations, Budget.recommendations_version),
+}
+BULK_DEFAULT_INCLUDE = 'input_data,calculations'
+
+def _bulk_recommendations(rows):
+    cache = _recommendations_cache()
+    bodies = {}
+    stale_ids = []
+    for row in rows:
+        cache_key = (row.id, RECOMMENDATION_RULES_VERSION)
+        body = cache.get(cache_key)
+        if body is None and row.recommendations and row.recommendations_version == RECOMMENDATION_RULES_VERSION:
+            body = row.recommendations
+            cache.set(cache_key, body)
+        if body is None:
+            stale_ids.append(row.id)
+        else:
+            bodies[row.id] = body
+    if stale_ids:
+        for budget in Budget.query.filter(Budget.id.in_(stale_ids)):
+            calc = serialization.loads(budget.calculations) if budget.calculations else {}
+            input_data = serialization.loads(budget.input_data) if budget.input_data else {}
+            body = precompute_recommendations(budget, calc, input_data)
+            if body is not None:
+                bodies[budget.id] = body
+                cache.set((budget.id, RECOMMENDATION_RULES_VERSION), body)
+        db.session.commit()
+    return {budget_id: serialization.loads(body) for budget_id, body in bodies.items()}
+
+@api.route('/budgets/bulk', methods=['GET'])
+def get_budgets_bulk():
+    try:
+        try:
+            budget_ids = list(dict.fromkeys(int(value) for value in request.args.get('ids', '').split(',')
+                                            if value.strip()))
+        except ValueError:
+            return jsonify({'error': 'ids must be a comma-separated list of integer IDs'}), 400
+        if not budget_ids:
+            return jsonify({'error': 'ids is required'}), 400
+        max_budgets = current_app.config['BULK_MAX_BUDGETS']
+        if len(budget_ids) > max_budgets:
+            return jsonify({'error': f'Cannot fetch more than {max_budgets} budgets'}), 400
+        include = request.args.get('include', BULK_DEFAULT_INCLUDE)
+        include = list(dict.fromkeys(field.strip() for field in include.split(',') if field.strip()))
+        unknown = [field for field in include if field not in BULK_INCLUDES]
+        if unknown:
+            return jsonify({'error': f"Unknown include fields: {', '.join(unknown)}",
+                            'allowed': list(BULK_INCLUDES)}), 400
+
+        columns = [Budget.id, Budget.name, Budget.created_at, Budget.version]
+        for field in include:
+            columns.extend(BULK_INCLUDES[field])
+        rows = db.session.query(*columns).filter(Budget.id.in_(budget_ids)).all()
+        rows_by_id = {row.id: row for row in rows}
+        recommendations = _bulk_recommendations(rows) if 'recommendations' in include else {}
+
+        budgets = []
+        for budget_id in budget_ids:
+            row = rows_by_id.get(budget_id)
+            if row is None:
+                continue
+            budget = {
+                'id': str(row.id),
+                'name': row.name,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'version': row.version or 1
+            }
+            for field in ('input_data', 'calculations', 'charts'):
+                if field in include:
+                    value = getattr(row, field)
+                    budget[field] = serialization.loads(value) if value else {}
+            if 'recommendations' in include:
+                budget['recommendations'] = recommendations.get(row.id, [])
+            budgets.append(budget)
+        return jsonify({
+            'budgets': budgets,
+            'missing_ids': [budget_id for budget_id in budget_ids if budget_id not in rows_by_id]
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/compare', methods=['POST'])
+def compare_budgets_route():
+    try:
+        data = request.json or {}
+        budget_ids = data.get('budget_ids')
+        if not isinstance(budget_ids, list) or not budget_ids:
+            return jsonify({'error': 'budget_ids must be a non-empty list'}), 400
+        try:
+            budget_ids = list(dict.fromkeys(int(budget_id) for budget_id in budget_ids))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'budget_ids must contain integer IDs'}), 400
+        max_budgets = current_app.config.get('COMPARE_MAX_BUDGETS', 100)
+        if len(budget_ids) > max_budgets:
+            return jsonify({'error': f'Cannot compare more than {max_budgets} budgets'}), 400
+        try:
+            baseline_id = int(data.get('baseline_id', budget_ids[0]))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'baseline_id must be an integer'}), 400
+        if baseline_id not in budget_ids:
+            return jsonify({'error': 'baseline_id must be one of budget_ids'}), 400
+
+        rows = (db.session.query(Budget.id, Budget.name, Budget.calculations)
+                .filter(Budget.id.in_(budget_ids))
+                .all())
+        rows_by_id = {row.id: row for row in rows}
+        missing = [budget_id for budget_id in budget_ids if budget_id not in rows_by_id]
+        if missing:
+            return jsonify({'error': 'Budgets not found', 'missing_ids': missing}), 404
+
+        names = [rows_by_id[budget_id].name for budget_id in budget_ids]
+        calculations = [serialization.loads(rows_by_id[budget_id].calculations) for budget_id in budget_ids]
+        result = {
+            'budget_ids': budget_ids,
+            'names': names,
+            'baseline_id': baseline_id,
+            **compare_budgets(calculations, budget_ids.index(baseline_id))
+        }
+        if data.get('include_chart'):
+            try:
+                with admission_slot('chart_render'):
+                    result['chart'] = generate_comparison_chart(names, calculations)
+            except Overloaded as e:
+                if not current_app.config['DEGRADED_MODE']:
+                    return overloaded_response(e)
+                result['chart_deferred'] = True
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def update_budget(budget, changes, chart_format='png'):
+    unknown_fields = sorted(set(changes) - set(INPUT_FIELDS) - {'name'})
+    if unknown_fields:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown_fields)}"}), 400
+    if 'name' in changes and not str(changes['name'] or '').strip():
+        return jsonify({'error': 'Budget name cannot be empty'}), 400
+
+    stored_input = serialization.loads(budget.input_data) if budget.input_data else {}
+    merged = {**stored_input, **changes}
+    validation_error = validate_budget_input(merged)
+    if validation_error is not None:
+        return jsonify(validation_error), 400
+
+    calc = serialization.loads(budget.calculations) if budget.calculations else {}
+    charts = serialization.loads(budget.charts) if budget.charts else {}
+    fields = affected_fields(changed_inputs(stored_input, merged))
+    if not set(DERIVED_DEPENDENCIES) <= set(calc):
+        fields = set(DERIVED_DEPENDENCIES)
+    if fields:
+        try:
+            new_calc = calculate_budget(merged)
+        except ValueError as e:
+            return jsonify({
+                'error': str(e),
+                'validation_errors': {'general': 'Invalid numeric values provided'}
+            }), 400
+        for field in fields:
+            calc[field] = new_calc[field]
+
+    stale_charts = affected_charts(fields) if charts else set(CHART_RENDERERS)
+    if not charts_in_format(charts, chart_format):
+        stale_charts = set(CHART_RENDERERS)
+    charts_deferred = False
+    if stale_charts:
+        try:
+            with admission_slot('chart_render', chart_format):
+                rendered = generate_charts(calc, budget.id, only=stale_charts, chart_format=chart_format)
+            for name in stale_charts:
+                if name in rendered:
+                    charts[name] = rendered[name]
+                else:
+                    charts.pop(name, None)
+        except Overloaded as e:
+            if not current_app.config['DEGRADED_MODE']:
+                return overloaded_response(e)
+            charts, charts_deferred = {}, True
+
+    input_data = build_input_data(merged)
+    name = str(changes['name']).strip() if 'name' in changes else budget.name
+    if fields or stale_charts or name != budget.name:
+        budget.name = name
+        budget.input_data = serialization.dumps(input_data)
+        budget.calculations = serialization.dumps(calc)
+        budget.charts = None if charts_deferred else serialization.dumps(charts)
+        budget.version = (budget.version or 1) + 1
+        recommendations_body = precompute_recommendations(budget, calc, input_data)
+        db.session.commit()
+        cache_key = (budget.id, RECOMMENDATION_RULES_VERSION)
+        if recommendations_body is not None:
+            _recommendations_cache().set(cache_key, recommendations_body)
+        else:
+            _recommendations_cache().invalidate(cache_key)
+        if fields:
+            _percentile_index().upsert(budget.id, calc)
+
+    budget_dict = budget.to_dict(input_data=input_data, calculations=calc, charts=charts)
+    budget_dict['recomputed'] = {
+        'fields': sorted(fields),
+        'charts': sorted(stale_charts),
+        'reused_charts': sorted(set(charts) - stale_charts)
+    }
+    response = jsonify(budget_dict)
+    if charts_deferred:
+        response.headers['X-Charts-Deferred'] = 'true'
+    else:
+        response.set_etag(budget.etag)
+    return response
+
+@api.route('/budget/<int:budget_id>', methods=['GET', 'PATCH', 'DELETE'])
 def handle_budget(budget_id):
     import logging
     app = current_app._get_current_object()
@@ -338,33 +766,104 @@ def handle_budget(budget_id):
     
     if request.method == 'GET':
         try:
+            chart_format, format_error = requested_chart_format()
+            if format_error is not None:
+                return format_error
+            # The version only identifies the stored charts, so an explicit format has to be checked against them.
+            explicit_format = 'chart_format' in request.args
+            if request.if_none_match and not explicit_format:
+                version = (db.session.query(Budget.version)
+                           .filter(Budget.id == budget_id, Budget.charts.isnot(None),
+                                   Budget.charts.notin_(['', '{}']))
+                           .scalar())
+                if version is not None and request.if_none_match.contains(f'{budget_id}-{version}'):
+                    response = current_app.response_class(status=304)
+                    response.set_etag(f'{budget_id}-{version}')
+                    return response
             budget = Budget.query.get_or_404(budget_id)
             budget_dict = budget.to_dict()
 
+            charts_deferred = False
             if not budget_dict.get('charts'):
                 try:
-                    calc = json.loads(budget.calculations)
-                    charts = generate_charts(calc, budget.id)
-                    budget.charts = json.dumps(charts)
-                    db.session.commit()
-                    budget_dict = budget.to_dict()
-                except Exception as chart_error:
-                    print(f"Error generating charts for budget {budget_id}: {chart_error}")
+                    with admission_slot('lazy_charts', chart_format):
+                        try:
+                            calc = serialization.loads(budget.calculations)
+                            charts = generate_charts(calc, budget.id, chart_format=chart_format)
+                            budget.charts = serialization.dumps(charts)
+                            budget.version = (budget.version or 1) + 1
+                            db.session.commit()
+                            budget_dict = budget.to_dict()
+                        except Exception as chart_error:
+                            db.session.rollback()
+                            print(f"Error generating charts for budget {budget_id}: {chart_error}")
+                            budget_dict['charts'] = {}
+                except Overloaded as e:
+                    if not current_app.config['DEGRADED_MODE']:
+                        return overloaded_response(e)
                     budget_dict['charts'] = {}
-            return jsonify(budget_dict)
+                    charts_deferred = True
+            response = jsonify(budget_dict)
+            if budget_dict['charts'] and (not explicit_format or charts_in_format(budget_dict['charts'], chart_format)):
+                response.set_etag(budget.etag)
+            if charts_deferred:
+                response.headers['X-Charts-Deferred'] = 'true'
+            return response
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+
+    elif request.method == 'PATCH':
+        try:
+            chart_format, format_error = requested_chart_format()
+            if format_error is not None:
+                return format_error
+            changes = request.json or {}
+            if not isinstance(changes, dict):
+                return jsonify({'error': 'Request body must be a JSON object'}), 400
+            budget = db.session.get(Budget, budget_id)
+            if budget is None:
+                return jsonify({'error': 'Budget not found'}), 404
+            return update_budget(budget, changes, chart_format)
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
     
     elif request.method == 'DELETE':
         try:
             budget = Budget.query.get_or_404(budget_id)
             db.session.delete(budget)
             db.session.commit()
+            _recommendations_cache().invalidate((budget_id, RECOMMENDATION_RULES_VERSION))
+            _percentile_index().remove(budget_id)
             return jsonify({'message': 'Budget deleted successfully'}), 200
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+def _percentile_index():
+    return current_app.extensions['percentile_index']
+
+@api.route('/budget/<int:budget_id>/rank', methods=['GET'])
+def rank_budget(budget_id):
+    try:
+        index = _percentile_index()
+        index.ensure_fresh(current_app._get_current_object())
+        metrics = index.metrics_for(budget_id)
+        if metrics is None:
+            calculations = db.session.query(Budget.calculations).filter(Budget.id == budget_id).scalar()
+            if calculations is None:
+                return jsonify({'error': 'Budget not found'}), 404
+            calc = serialization.loads(calculations)
+            index.upsert(budget_id, calc)
+            metrics = metric_values(calc)
+        return jsonify({
+            'budget_id': budget_id,
+            'metrics': index.percentiles(metrics),
+            'index': index.status()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @api.route('/debug', methods=['POST'])
 def debug_budget():
     try:
@@ -398,141 +897,209 @@ def debug_budget():
         print(f"DEBUG: Traceback: {traceback.format_exc()}")
         return jsonify({'error': str(e)}), 500
     
-@api.route('/recommendations/<int:budget_id>', methods=['GET'])
-def get_recommendations(budget_id):
-    try:
-        budget = Budget.query.get_or_404(budget_id)
-        calc = json.loads(budget.calculations)
-        input_data = json.loads(budget.input_data)
-        recommendations = []
-
-        if calc['savings_rate'] < 10:
-            recommendations.append({
-                'type': 'warning',
-                'title': 'Low Total Savings Rate',
-                'message': f"Your current total savings rate (including 401k) is {calc['savings_rate']:.1f}%. Consider increasing contributions to reach the recommended 20% savings rate."
-            })
-        elif calc['savings_rate'] < 20:
-            recommendations.append({
-                'type': 'info',
-                'title': 'Good Savings Rate',
-                'message': f"Your total savings rate of {calc['savings_rate']:.1f}% is good. Try to reach 20% for optimal financial health."
-            })
-        else:
-            recommendations.append({
-                'type': 'success',
-                'title': 'Excellent Savings Rate',
-                'message': f"Your total savings rate of {calc['savings_rate']:.1f}% is excellent! You're on track for strong financial growth."
-            })
-
-        current_401k_raw = input_data.get('retirement_401k', 0)
-        employer_401k_raw = input_data.get('employer_401k_match', 0)
-        current_401k_percent = float(current_401k_raw) if current_401k_raw and current_401k_raw != '' else 0.0
-        employer_match_percent = float(employer_401k_raw) if employer_401k_raw and employer_401k_raw != '' else 0.0
-
-        if calc['monthly_401k_employee'] == 0:
-            recommendations.append({
-                'type': 'warning',
-                'title': 'No 401k Contributions',
-                'message': "Consider contributing to a 401k if available. It's a tax-advantaged way to save for retirement and many employers offer matching. Start with 3-5% of your paycheck."
-            })
-        elif current_401k_percent < 15:
-            total_401k_message = f"You're currently contributing {current_401k_percent}% of your paycheck (${calc['monthly_401k_employee']:,.2f} monthly) to your 401k."
-            if employer_match_percent > 0:
-                total_401k_message += f" Your employer matches {employer_match_percent}% (${calc['monthly_401k_employer']:,.2f} monthly), giving you a total of ${calc['monthly_401k_total']:,.2f} monthly towards retirement!"
-            total_401k_message += " Consider gradually increasing to 15-20% for optimal retirement savings."
-            recommendations.append({
-                'type': 'info',
-                'title': 'Consider Increasing 401k',
-                'message': total_401k_message
-            })
-        else:
-            total_401k_message = f"You're contributing {current_401k_percent}% of your paycheck (${calc['monthly_401k_employee']:,.2f} monthly) to your 401k."
-            if employer_match_percent > 0:
-                total_401k_message += f" With your employer's {employer_match_percent}% match (${calc['monthly_401k_employer']:,.2f} monthly), your total retirement savings is ${calc['monthly_401k_total']:,.2f} monthly, or ${calc['yearly_401k_total_savings']:,.2f} annually!"
-            else:
-                total_401k_message += f" This equals ${calc['yearly_401k_employee_savings']:,.2f} annually towards retirement."
-            total_401k_message += " Excellent planning!"
-            recommendations.append({
-                'type': 'success',
-                'title': 'Excellent Retirement Planning',
-                'message': total_401k_message
-            })
+RECOMMENDATION_RULES_VERSION = 1
+
+def build_recommendations(calc, input_data):
+    recommendations = []
+
+    if calc['savings_rate'] < 10:
+        recommendations.append({
+            'type': 'warning',
+            'title': 'Low Total Savings Rate',
+            'message': f"Your current total savings rate (including 401k) is {calc['savings_rate']:.1f}%. Consider increasing contributions to reach the recommended 20% savings rate."
+        })
+    elif calc['savings_rate'] < 20:
+        recommendations.append({
+            'type': 'info',
+            'title': 'Good Savings Rate',
+            'message': f"Your total savings rate of {calc['savings_rate']:.1f}% is good. Try to reach 20% for optimal financial health."
+        })
+    else:
+        recommendations.append({
+            'type': 'success',
+            'title': 'Excellent Savings Rate',
+            'message': f"Your total savings rate of {calc['savings_rate']:.1f}% is excellent! You're on track for strong financial growth."
+        })
+
+    current_401k_raw = input_data.get('retirement_401k', 0)
+    employer_401k_raw = input_data.get('employer_401k_match', 0)
+    current_401k_percent = float(current_401k_raw) if current_401k_raw and current_401k_raw != '' else 0.0
+    employer_match_percent = float(employer_401k_raw) if employer_401k_raw and employer_401k_raw != '' else 0.0
 
+    if calc['monthly_401k_employee'] == 0:
+        recommendations.append({
+            'type': 'warning',
+            'title': 'No 401k Contributions',
+            'message': "Consider contributing to a 401k if available. It's a tax-advantaged way to save for retirement and many employers offer matching. Start with 3-5% of your paycheck."
+        })
+    elif current_401k_percent < 15:
+        total_401k_message = f"You're currently contributing {current_401k_percent}% of your paycheck (${calc['monthly_401k_employee']:,.2f} monthly) to your 401k."
         if employer_match_percent > 0:
-            recommendations.append({
-                'type': 'success',
-                'title': 'Great Job Utilizing Employer Match!',
-                'message': f"You're taking advantage of your employer's {employer_match_percent}% 401k match, which adds ${calc['monthly_401k_employer']:,.2f} monthly (${calc['yearly_401k_employer_savings']:,.2f} annually) in free money towards your retirement!"
-            })
-        elif current_401k_percent > 0:
-            recommendations.append({
-                'type': 'info',
-                'title': 'Consider Adding Employer Match',
-                'message': "If your employer offers 401k matching, make sure you're contributing enough to get the full match - it's free money towards your retirement!"
-            })
-
-        monthly_expenses = float(calc['total_expenses'])
-        emergency_fund_target = monthly_expenses * 6
-        liquid_savings = float(calc['liquid_savings'])
+            total_401k_message += f" Your employer matches {employer_match_percent}% (${calc['monthly_401k_employer']:,.2f} monthly), giving you a total of ${calc['monthly_401k_total']:,.2f} monthly towards retirement!"
+        total_401k_message += " Consider gradually increasing to 15-20% for optimal retirement savings."
         recommendations.append({
             'type': 'info',
-            'title': 'Emergency Fund Goal',
-            'message': f"Build an emergency fund of ${emergency_fund_target:,.2f} (6 months of expenses). At your current liquid savings rate, this would take {emergency_fund_target / liquid_savings:.1f} months." if liquid_savings > 0 else f"Build an emergency fund of ${emergency_fund_target:,.2f} (6 months of expenses)."
+            'title': 'Consider Increasing 401k',
+            'message': total_401k_message
         })
-        expenses = calc['expense_breakdown']
-        rent_mortgage = float(expenses['rent_mortgage'])
-        monthly_income = float(calc['monthly_income'])
-
-        if rent_mortgage / monthly_income > 0.3:
-            recommendations.append({
-                'type': 'warning',
-                'title': 'High Housing Costs',
-                'message': f"Housing costs are {(rent_mortgage / monthly_income * 100):.1f}% of income. Consider reducing to 30% or less."
-            })
-        return jsonify(recommendations)
+    else:
+        total_401k_message = f"You're contributing {current_401k_percent}% of your paycheck (${calc['monthly_401k_employee']:,.2f} monthly) to your 401k."
+        if employer_match_percent > 0:
+            total_401k_message += f" With your employer's {employer_match_percent}% match (${calc['monthly_401k_employer']:,.2f} monthly), your total retirement savings is ${calc['monthly_401k_total']:,.2f} monthly, or ${calc['yearly_401k_total_savings']:,.2f} annually!"
+        else:
+            total_401k_message += f" This equals ${calc['yearly_401k_employee_savings']:,.2f} annually towards retirement."
+        total_401k_message += " Excellent planning!"
+        recommendations.append({
+            'type': 'success',
+            'title': 'Excellent Retirement Planning',
+            'message': total_401k_message
+        })
+
+    if employer_match_percent > 0:
+        recommendations.append({
+            'type': 'success',
+            'title': 'Great Job Utilizing Employer Match!',
+            'message': f"You're taking advantage of your employer's {employer_match_percent}% 401k match, which adds ${calc['monthly_401k_employer']:,.2f} monthly (${calc['yearly_401k_employer_savings']:,.2f} annually) in free money towards your retirement!"
+        })
+    elif current_401k_percent > 0:
+        recommendations.append({
+            'type': 'info',
+            'title': 'Consider Adding Employer Match',
+            'message': "If your employer offers 401k matching, make sure you're contributing enough to get the full match - it's free money towards your retirement!"
+        })
+
+    monthly_expenses = float(calc['total_expenses'])
+    emergency_fund_target = monthly_expenses * 6
+    liquid_savings = float(calc['liquid_savings'])
+    recommendations.append({
+        'type': 'info',
+        'title': 'Emergency Fund Goal',
+        'message': f"Build an emergency fund of ${emergency_fund_target:,.2f} (6 months of expenses). At your current liquid savings rate, this would take {emergency_fund_target / liquid_savings:.1f} months." if liquid_savings > 0 else f"Build an emergency fund of ${emergency_fund_target:,.2f} (6 months of expenses)."
+    })
+    expenses = calc['expense_breakdown']
+    rent_mortgage = float(expenses['rent_mortgage'])
+    monthly_income = float(calc['monthly_income'])
+
+    if rent_mortgage / monthly_income > 0.3:
+        recommendations.append({
+            'type': 'warning',
+            'title': 'High Housing Costs',
+            'message': f"Housing costs are {(rent_mortgage / monthly_income * 100):.1f}% of income. Consider reducing to 30% or less."
+        })
+    return recommendations
+
+def _store_recommendations(budget, recommendations):
+    body = serialization.dumps(recommendations)
+    budget.recommendations = body
+    budget.recommendations_version = RECOMMENDATION_RULES_VERSION
+    return body
+
+def precompute_recommendations(budget, calc, input_data):
+    try:
+        return _store_recommendations(budget, build_recommendations(calc, input_data))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        budget.recommendations = None
+        budget.recommendations_version = None
+        return None
+
+def _recommendations_cache():
+    return current_app.extensions['recommendations_cache']
+
+def _recommendations_response(body):
+    return current_app.response_class(body, mimetype='application/json')
+
+@api.route('/recommendations/<int:budget_id>', methods=['GET'])
+def get_recommendations(budget_id):
+    try:
+        cache = _recommendations_cache()
+        cache_key = (budget_id, RECOMMENDATION_RULES_VERSION)
+        body = cache.get(cache_key)
+        if body is not None:
+            return _recommendations_response(body)
+
+        stored = (db.session.query(Budget.recommendations, Budget.recommendations_version)
+                  .filter(Budget.id == budget_id)
+                  .first())
+        if stored is None:
+            return jsonify({'error': 'Budget not found'}), 404
+        if stored.recommendations and stored.recommendations_version == RECOMMENDATION_RULES_VERSION:
+            body = stored.recommendations
+        else:
+            budget = db.session.get(Budget, budget_id)
+            calc = serialization.loads(budget.calculations)
+            input_data = serialization.loads(budget.input_data)
+            body = _store_recommendations(budget, build_recommendations(calc, input_data))
+            db.session.commit()
+        cache.set(cache_key, body)
+        return _recommendations_response(body)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
+def health_snapshot():
+    budget_count = Budget.query.count()
+
+    import psutil
+    import os
+
+    memory = psutil.virtual_memory()
+    process = psutil.Process(os.getpid())
+    return {
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'database': {
+            'connected': True,
+            'budget_count': budget_count
+        },
+        'system': {
+            'memory_usage_percent': memory.percent,
+            'memory_available_gb': round(memory.available / 1024 / 1024 / 1024, 2),
+            'cpu_count': psutil.cpu_count(),
+            'process_memory_mb': round(process.memory_info().rss / 1024 / 1024, 2)
+        },
+        'startup': current_app.extensions['startup_profile'].to_dict(),
+        'caches': {
+            'recommendations': _recommendations_cache().stats()
+        },
+        'admission': {
+            name: limiter.stats() for name, limiter in current_app.extensions['admission'].items()
+        },
+        'percentile_index': _percentile_index().status(),
+        'requests': current_app.extensions['endpoint_stats'].sample(),
+        'health_stream': current_app.extensions['health_sampler'].stats(),
+        'api': {
+            'version': '1.0.0',
+            'endpoints': [
+                '/api/calculate',
+                '/api/budgets', 
+                '/api/budgets/search',
+                '/api/budgets/bulk',
+                '/api/budget/<id>',
+                '/api/budget/<id>/rank',
+                '/api/compare',
+                '/api/recommendations/<id>',
+                '/api/debug',
+                '/api/health',
+                '/api/health/stream'
+            ]
+        }
+    }
+
 @api.route('/health', methods=['GET'])
 def health_check():
     try:
-        budget_count = Budget.query.count()
-
-        import psutil
-        import os
-        
-        memory = psutil.virtual_memory()
-        process = psutil.Process(os.getpid())
-        health_data = {
-            'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
-            'database': {
-                'connected': True,
-                'budget_count': budget_count
-            },
-            'system': {
-                'memory_usage_percent': memory.percent,
-                'memory_available_gb': round(memory.available / 1024 / 1024 / 1024, 2),
-                'cpu_count': psutil.cpu_count(),
-                'process_memory_mb': round(process.memory_info().rss / 1024 / 1024, 2)
-            },
-            'api': {
-                'version': '1.0.0',
-                'endpoints': [
-                    '/api/calculate',
-                    '/api/budgets', 
-                    '/api/budget/<id>',
-                    '/api/recommendations/<id>',
-                    '/api/debug',
-                    '/api/health'
-                ]
-            }
-        }
-        return jsonify(health_data)
+        return jsonify(health_snapshot())
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
             'error': str(e),
             'timestamp': datetime.now().isoformat()
         }), 500
+
+@api.route('/health/stream', methods=['GET'])
+def health_stream_route():
+    sampler = current_app.extensions['health_sampler']
+    response = current_app.response_class(sampler.events(request.headers.get('Last-Event-ID', type=int)),
+                                          mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
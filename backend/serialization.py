@@ -0,0 +1,60 @@
+import dataclasses
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+def _default_encoder(obj):
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    return DefaultJSONProvider.default(obj)
+
+def dumps(obj):
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default_encoder, option=_ORJSON_OPTIONS).decode()
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, default=_default_encoder, separators=(',', ':'))
+
+def loads(s):
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+def backend_name():
+    return 'orjson' if orjson is not None else 'json'
+
+class FastJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return dumps(obj)
+        kwargs.setdefault('default', _default_encoder)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        options = _ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        try:
+            body = orjson.dumps(obj, default=_default_encoder, option=options)
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,147 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+class StartupProfile:
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.phases = []
+        self.first_request = None
+        self.prewarm = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name, seconds):
+        with self._lock:
+            self.phases.append({'phase': name, 'seconds': round(seconds, 4)})
+
+    def record_first_request(self, endpoint, seconds):
+        with self._lock:
+            if self.first_request is not None:
+                return False
+            self.first_request = {
+                'endpoint': endpoint,
+                'seconds': round(seconds, 4),
+                'since_startup_seconds': round(time.perf_counter() - self.created, 4),
+                'chart_stack_loaded': _chart_stack is not None
+            }
+        logger.info(f"Startup: first request {endpoint} served in {seconds:.3f}s")
+        return True
+
+    def to_dict(self):
+        with self._lock:
+            phases = list(self.phases)
+            # The chart stack is imported once per process, so its cost is shared by every app.
+            if _chart_stack_seconds is not None:
+                phases.append({'phase': 'import:chart_stack', 'seconds': _chart_stack_seconds})
+            return {
+                'phases': phases,
+                'first_request': self.first_request,
+                'prewarm': self.prewarm,
+                'chart_stack_loaded': _chart_stack is not None
+            }
+
+_chart_stack = None
+_chart_stack_seconds = None
+_chart_stack_lock = threading.Lock()
+
+def load_chart_stack():
+    global _chart_stack, _chart_stack_seconds
+    if _chart_stack is not None:
+        return _chart_stack
+    with _chart_stack_lock:
+        if _chart_stack is None:
+            start = time.perf_counter()
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+            from matplotlib import font_manager
+            import seaborn as sns
+            import numpy as np
+            font_manager.fontManager.findfont('DejaVu Sans')
+            _chart_stack_seconds = round(time.perf_counter() - start, 4)
+            _chart_stack = (plt, sns, np)
+    return _chart_stack
+
+def _prewarm_chart_stack(profile):
+    start = time.perf_counter()
+    try:
+        load_chart_stack()
+        from io import BytesIO
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=(1, 1))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.pie([1, 1], labels=['a', 'b'], autopct='%1.1f%%')
+        ax.set_title('$0.00', fontweight='bold')
+        fig.savefig(BytesIO(), format='png', dpi=72)
+        profile.prewarm = {'status': 'done', 'seconds': round(time.perf_counter() - start, 4)}
+    except Exception as e:
+        profile.prewarm = {'status': 'failed', 'error': str(e)}
+        logger.warning(f"Startup: chart prewarm failed: {e}")
+
+def prewarm_chart_stack(profile):
+    if profile.prewarm is not None:
+        return None
+    profile.prewarm = {'status': 'running'}
+    thread = threading.Thread(target=_prewarm_chart_stack, args=(profile,), name='chart-prewarm', daemon=True)
+    thread.start()
+    return thread
+
+def init_app(app):
+    profile = app.extensions['startup_profile']
+
+    @app.before_request
+    def mark_first_request():
+        if profile.first_request is None:
+            g.startup_request_start = time.perf_counter()
+
+    @app.after_request
+    def record_first_request(response):
+        start = g.pop('startup_request_start', None)
+        if start is not None:
+            first = profile.record_first_request(request.endpoint, time.perf_counter() - start)
+            if first and app.config.get('PREWARM_CHARTS'):
+                prewarm_chart_stack(profile)
+        return response
+
+def profile_imports(module='app', limit=15):
+    env = dict(os.environ, FAST_START='true')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        entries.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2
+        })
+    total = next((entry for entry in entries if entry['module'] == module and entry['depth'] == 0), None)
+    direct = [entry for entry in entries if entry['depth'] == 1]
+    return {
+        'module': module,
+        'total_ms': total['cumulative_ms'] if total else None,
+        'slowest': sorted(direct, key=lambda entry: entry['cumulative_ms'], reverse=True)[:limit]
+    }
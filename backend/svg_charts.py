@@ -0,0 +1,216 @@
+import base64
+import math
+from xml.sax.saxutils import escape
+
+try:
+    import cairosvg
+except ImportError:
+    cairosvg = None
+
+# seaborn.color_palette("husl", n) and ("Set2", 2), as used by the matplotlib renderers.
+HUSL_PALETTES = {
+    1: ['#f77189'],
+    2: ['#f77189', '#36ada4'],
+    3: ['#f77189', '#50b131', '#3ba3ec'],
+    4: ['#f77189', '#97a431', '#36ada4', '#a48cf4'],
+    5: ['#f77189', '#ae9d31', '#33b07a', '#38a9c5', '#cc7af4'],
+    6: ['#f77189', '#bb9832', '#50b131', '#36ada4', '#3ba3ec', '#e866f4'],
+    7: ['#f77189', '#c69432', '#82a931', '#34af8a', '#37aabb', '#8197f4', '#f45deb'],
+}
+SET2_PALETTE = ['#66c2a5', '#fc8d62', '#8da0cb', '#e78ac3']
+AXES_FACE = '#eaeaf2'
+TEXT_COLOR = '#262626'
+PX_PER_INCH = 80
+SVG_BASE64_PREFIX = 'PHN2Zy'
+FONT_FAMILY = 'DejaVu Sans, Arial, Liberation Sans, sans-serif'
+
+def _pt(points):
+    return round(points * PX_PER_INCH / 72, 1)
+
+def _text(x, y, content, size=10, anchor='middle', weight='normal', color=TEXT_COLOR, baseline='auto', rotate=None):
+    transform = f' transform="rotate({rotate} {x:.1f} {y:.1f})"' if rotate else ''
+    bold = ' font-weight="bold"' if weight == 'bold' else ''
+    return (f'<text x="{x:.1f}" y="{y:.1f}" font-size="{_pt(size)}" text-anchor="{anchor}" '
+            f'dominant-baseline="{baseline}" fill="{color}"{bold}{transform}>{escape(str(content))}</text>')
+
+def _document(width_in, height_in, elements):
+    width, height = width_in * PX_PER_INCH, height_in * PX_PER_INCH
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" font-family="{FONT_FAMILY}">'
+            f'<rect width="{width}" height="{height}" fill="#ffffff"/>'
+            + ''.join(elements) + '</svg>')
+
+def husl_palette(count):
+    if count in HUSL_PALETTES:
+        return HUSL_PALETTES[count]
+    return [HUSL_PALETTES[7][i % 7] for i in range(count)]
+
+def nice_ticks(low, high, target=6):
+    if high <= low:
+        high = low + 1
+    raw_step = (high - low) / target
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw_step)
+    start = math.floor(low / step) * step
+    ticks = []
+    value = start
+    while value <= high + step * 1e-9:
+        ticks.append(round(value, 10))
+        value += step
+    if ticks[-1] < high:
+        ticks.append(ticks[-1] + step)
+    return ticks
+
+def render_pie(labels, values, title):
+    width_in, height_in = 10, 8
+    cx, cy = width_in * PX_PER_INCH / 2, height_in * PX_PER_INCH / 2 + 20
+    radius = 230
+    total = sum(values)
+    colors = husl_palette(len(values))
+    elements = [_text(cx, 40, title, size=16, weight='bold')]
+    wedges, annotations = [], []
+    angle = 90.0
+    for label, value, color in zip(labels, values, colors):
+        sweep = 360.0 * value / total if total else 0
+        start, end = math.radians(angle), math.radians(angle + sweep)
+        if sweep >= 359.999:
+            wedges.append(f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{radius}" fill="{color}"/>')
+        elif sweep > 0:
+            x1, y1 = cx + radius * math.cos(start), cy - radius * math.sin(start)
+            x2, y2 = cx + radius * math.cos(end), cy - radius * math.sin(end)
+            large_arc = 1 if sweep > 180 else 0
+            wedges.append(f'<path d="M{cx:.1f},{cy:.1f} L{x1:.1f},{y1:.1f} '
+                          f'A{radius},{radius} 0 {large_arc} 0 {x2:.1f},{y2:.1f} Z" fill="{color}"/>')
+        middle = math.radians(angle + sweep / 2)
+        cos_m, sin_m = math.cos(middle), math.sin(middle)
+        annotations.append(_text(cx + 0.6 * radius * cos_m, cy - 0.6 * radius * sin_m,
+                                 f'{100.0 * value / total:.1f}%' if total else '0.0%',
+                                 size=10, weight='bold', color='#ffffff', baseline='middle'))
+        annotations.append(_text(cx + 1.1 * radius * cos_m, cy - 1.1 * radius * sin_m, label,
+                                 size=10, anchor='start' if cos_m >= 0 else 'end', baseline='middle'))
+        angle += sweep
+    return _document(width_in, height_in, elements + wedges + annotations)
+
+def render_bars(width_in, height_in, title, categories, series, bar_width, value_format,
+                ylabel, xlabel=None, label_size=10, legend=False):
+    width, height = width_in * PX_PER_INCH, height_in * PX_PER_INCH
+    left, right, top, bottom = 100, 25, 70, 70 if xlabel else 50
+    plot_width, plot_height = width - left - right, height - top - bottom
+    all_values = [value for _, _, values in series for value in values]
+    ticks = nice_ticks(min(0.0, min(all_values, default=0.0)), max(0.0, max(all_values, default=0.0)) * 1.05)
+    y_low, y_high = ticks[0], ticks[-1]
+    count = len(categories)
+    group_width = bar_width * len(series)
+    x_low, x_high = -group_width / 2 - 0.05 * count, count - 1 + group_width / 2 + 0.05 * count
+
+    def px(x):
+        return left + (x - x_low) / (x_high - x_low) * plot_width
+
+    def py(y):
+        return top + (y_high - y) / (y_high - y_low) * plot_height
+
+    elements = [f'<rect x="{left}" y="{top}" width="{plot_width}" height="{plot_height}" fill="{AXES_FACE}"/>']
+    for tick in ticks:
+        y = py(tick)
+        elements.append(f'<line x1="{left}" y1="{y:.1f}" x2="{left + plot_width}" y2="{y:.1f}" '
+                        f'stroke="#ffffff" stroke-opacity="0.8"/>')
+        elements.append(_text(left - 8, y, f'${tick:,.0f}', anchor='end', baseline='middle'))
+    for index, category in enumerate(categories):
+        elements.append(_text(px(index), top + plot_height + 18, category, baseline='middle'))
+
+    zero = py(0.0)
+    for series_index, (label, color, values) in enumerate(series):
+        offset = (series_index - (len(series) - 1) / 2) * bar_width
+        for index, value in enumerate(values):
+            x0 = px(index + offset - bar_width / 2)
+            bar_px = px(index + offset + bar_width / 2) - x0
+            y = py(value)
+            fill = color[index] if isinstance(color, list) else color
+            elements.append(f'<rect x="{x0:.1f}" y="{min(y, zero):.1f}" width="{bar_px:.1f}" '
+                            f'height="{abs(zero - y):.1f}" fill="{fill}" fill-opacity="0.8"/>')
+            elements.append(_text(x0 + bar_px / 2, y - 4, value_format(value), size=label_size, weight='bold'))
+
+    elements.append(_text(width / 2, 35, title, size=16, weight='bold'))
+    elements.append(_text(25, top + plot_height / 2, ylabel, size=12, weight='bold', baseline='middle',
+                          rotate=-90))
+    if xlabel:
+        elements.append(_text(left + plot_width / 2, height - 18, xlabel, size=12, weight='bold'))
+    if legend:
+        box_height = 22 * len(series) + 10
+        box_width = 10 + 9 * max(len(label) for label, _, _ in series) + 30
+        elements.append(f'<rect x="{left + 10}" y="{top + 10}" width="{box_width}" height="{box_height}" '
+                        f'fill="#ffffff" fill-opacity="0.8" rx="4"/>')
+        for index, (label, color, _) in enumerate(series):
+            y = top + 25 + 22 * index
+            elements.append(f'<rect x="{left + 20}" y="{y - 7}" width="20" height="14" fill="{color}" '
+                            f'fill-opacity="0.8"/>')
+            elements.append(_text(left + 48, y, label, anchor='start', baseline='middle'))
+    return _document(width_in, height_in, elements)
+
+def render_expense_breakdown_svg(budget_calc):
+    expenses = budget_calc['expense_breakdown']
+    labels = ['Rent/Mortgage', 'Car Insurance', 'Phone Bill', 'Miscellaneous', 'Liquid Savings']
+    values = [expenses['rent_mortgage'], expenses['car_insurance'],
+              expenses['phone_bill'], expenses['miscellaneous'],
+              expenses['liquid_savings']]
+    if expenses['401k_employee_savings'] > 0:
+        labels.append('Your 401k Contributions')
+        values.append(expenses['401k_employee_savings'])
+    if expenses['401k_employer_savings'] > 0:
+        labels.append('Employer 401k Match')
+        values.append(expenses['401k_employer_savings'])
+    non_zero_data = [(label, value) for label, value in zip(labels, values) if value > 0]
+    if non_zero_data:
+        labels, values = [list(items) for items in zip(*non_zero_data)]
+    return render_pie(labels, values, f'Monthly Budget Breakdown - ${sum(values):,.2f}')
+
+def render_savings_projection_svg(budget_calc):
+    projections = budget_calc['projections']
+    periods = ['1_year', '2_years', '10_years']
+    colors = husl_palette(2)
+    series = [
+        ('Liquid Savings', colors[0], [projections[period]['liquid'] for period in periods]),
+        ('401k Savings (Employee + Employer)', colors[1], [projections[period]['401k_total'] for period in periods]),
+    ]
+    return render_bars(12, 8, 'Savings Projections Over Time', ['1', '2', '10'], series, 0.35,
+                       lambda value: f'${value:,.0f}', 'Savings Amount ($)', xlabel='Years', legend=True)
+
+def render_401k_breakdown_svg(budget_calc):
+    if budget_calc['monthly_401k_total'] <= 0:
+        return None
+    categories, amounts = [], []
+    if budget_calc['monthly_401k_employee'] > 0:
+        categories.append('Your Contributions')
+        amounts.append(budget_calc['monthly_401k_employee'])
+    if budget_calc['monthly_401k_employer'] > 0:
+        categories.append('Employer Match')
+        amounts.append(budget_calc['monthly_401k_employer'])
+    series = [('401k', SET2_PALETTE[:len(amounts)], amounts)]
+    return render_bars(10, 6, 'Monthly 401k Contributions Breakdown', categories, series, 0.8,
+                       lambda value: f'${value:,.2f}', 'Monthly Amount ($)', label_size=12)
+
+SVG_RENDERERS = {
+    'expense_breakdown': render_expense_breakdown_svg,
+    'savings_projection': render_savings_projection_svg,
+    '401k_breakdown': render_401k_breakdown_svg,
+}
+
+def is_svg(chart):
+    return chart.startswith(SVG_BASE64_PREFIX)
+
+def rasterize_available():
+    return cairosvg is not None
+
+def generate_svg_charts(budget_calc, only=None, rasterize=False):
+    charts = {}
+    for name, renderer in SVG_RENDERERS.items():
+        if only is not None and name not in only:
+            continue
+        svg = renderer(budget_calc)
+        if svg is None:
+            continue
+        data = svg.encode()
+        if rasterize:
+            data = cairosvg.svg2png(bytestring=data)
+        charts[name] = base64.b64encode(data).decode()
+    return charts
@@ -2,11 +2,43 @@ import unittest
 from unittest.mock import patch, MagicMock
 import json
 import sys
+import time
 import os
+import tempfile
+import threading
+import sqlalchemy
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from app import create_app
 from models import db, Budget
 from routes import calculate_budget
+import serialization
+from dependencies import INPUT_FIELDS, affected_fields
+from cache import LRUCache
+from admission import AdmissionLimiter, Overloaded
+from backfill_charts import backfill_charts, select_budget_ids
+import svg_charts
+import xml.etree.ElementTree as ET
+import base64
+
+SAMPLE_INPUT = {
+    'yearly_salary': '60000',
+    'pay_per_check': '2307.69',
+    'pay_frequency': 'bi-weekly',
+    'retirement_401k': '',
+    'employer_401k_match': '',
+    'rent_mortgage': '1200',
+    'car_insurance': '150',
+    'phone_bill': '80',
+    'miscellaneous': '300'
+}
+
+SAMPLE_INPUT_401K = {
+    **SAMPLE_INPUT,
+    'yearly_salary': '75000',
+    'pay_per_check': '2884.62',
+    'retirement_401k': '10',
+    'employer_401k_match': '5'
+}
 
 class TestBudgetCalculations(unittest.TestCase):
     def setUp(self):
@@ -142,6 +174,707 @@ class TestBudgetCalculations(unittest.TestCase):
         monthly_result = calculate_budget(monthly_data)
         self.assertGreater(weekly_result['monthly_income'], 
                           biweekly_result['monthly_income'])
-        
+
+class AppTestCase(unittest.TestCase):
+    config = {}
+
+    def setUp(self):
+        self.app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', **self.config})
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+class TestBackfillCharts(AppTestCase):
+    def test_backfill_charts_for_missing_budgets(self):
+        data = {**SAMPLE_INPUT, 'retirement_401k': '5', 'employer_401k_match': '3'}
+        with self.app.app_context():
+            calc = json.dumps(calculate_budget(data).to_dict())
+            db.session.add(Budget(name='No Charts', input_data=json.dumps(data), calculations=calc))
+            db.session.add(Budget(name='Has Charts', input_data=json.dumps(data), calculations=calc,
+                                  charts=json.dumps({'expense_breakdown': 'abc'})))
+            db.session.commit()
+            budget_ids = select_budget_ids(missing_only=True)
+            self.assertEqual(len(budget_ids), 1)
+            summary = backfill_charts(budget_ids, workers=1, batch_size=10)
+            self.assertEqual(summary['rendered'], 1)
+            self.assertEqual(summary['failed'], 0)
+            budget = db.session.get(Budget, budget_ids[0])
+            self.assertIn('401k_breakdown', json.loads(budget.charts))
+            self.assertEqual(budget.version, 2)
+            self.assertEqual(select_budget_ids(missing_only=True), [])
+
+class TestIdempotentCreate(AppTestCase):
+    data = {**SAMPLE_INPUT, 'name': 'Retry Budget'}
+
+    def post(self, data, headers=None):
+        return self.client.post('/api/calculate', data=json.dumps(data),
+                                content_type='application/json', headers=headers or {})
+
+    @patch('routes.generate_charts', return_value={})
+    def test_idempotency_key_replays_existing_budget(self, mock_charts):
+        first = self.post(self.data, {'Idempotency-Key': 'abc-123'})
+        second = self.post(self.data, {'Idempotency-Key': 'abc-123'})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(json.loads(first.data)['id'], json.loads(second.data)['id'])
+        self.assertEqual(second.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(mock_charts.call_count, 1)
+        with self.app.app_context():
+            self.assertEqual(Budget.query.count(), 1)
+
+    @patch('routes.generate_charts', return_value={})
+    def test_idempotency_key_reused_with_different_body(self, mock_charts):
+        self.post(self.data, {'Idempotency-Key': 'abc-123'})
+        response = self.post({**self.data, 'phone_bill': '90'}, {'Idempotency-Key': 'abc-123'})
+        self.assertEqual(response.status_code, 422)
+
+    @patch('routes.generate_charts', return_value={})
+    def test_idempotency_key_replays_after_patch(self, mock_charts):
+        budget_id = json.loads(self.post(self.data, {'Idempotency-Key': 'abc-123'}).data)['id']
+        self.client.patch(f'/api/budget/{budget_id}', json={'phone_bill': '90'})
+        response = self.post(self.data, {'Idempotency-Key': 'abc-123'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['id'], budget_id)
+        self.assertEqual(response.headers.get('Idempotent-Replayed'), 'true')
+
+    @patch('routes.generate_charts', return_value={})
+    def test_dedup_window_matches_normalized_input(self, mock_charts):
+        self.app.config['DEDUP_WINDOW_SECONDS'] = 60
+        first = self.post(self.data)
+        second = self.post({**self.data, 'rent_mortgage': 1200.0, 'retirement_401k': '0'})
+        self.assertEqual(json.loads(first.data)['id'], json.loads(second.data)['id'])
+        self.assertEqual(mock_charts.call_count, 1)
+
+    def test_dedup_window_serializes_concurrent_requests(self):
+        handle, path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'DEDUP_WINDOW_SECONDS': 60})
+        responses = []
+
+        def slow_charts(*args, **kwargs):
+            time.sleep(0.2)
+            return {}
+
+        def post():
+            responses.append(app.test_client().post('/api/calculate', json=self.data))
+
+        with patch('routes.generate_charts', side_effect=slow_charts) as mock_charts:
+            threads = [threading.Thread(target=post) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(mock_charts.call_count, 1)
+        self.assertEqual(len({json.loads(response.data)['id'] for response in responses}), 1)
+        with app.app_context():
+            self.assertEqual(Budget.query.count(), 1)
+            db.session.remove()
+            db.engine.dispose()
+
+    @patch('routes.generate_charts', return_value={})
+    def test_dedup_window_distinguishes_pay_frequency_case(self, mock_charts):
+        self.app.config['DEDUP_WINDOW_SECONDS'] = 60
+        first = self.post({**self.data, 'pay_frequency': 'weekly'})
+        second = self.post({**self.data, 'pay_frequency': 'Weekly'})
+        self.assertNotEqual(json.loads(first.data)['id'], json.loads(second.data)['id'])
+        self.assertNotIn('Idempotent-Replayed', second.headers)
+        self.assertEqual(json.loads(second.data)['calculations']['monthly_income'],
+                         calculate_budget({**self.data, 'pay_frequency': 'Weekly'})['monthly_income'])
+
+    @patch('routes.generate_charts', return_value={})
+    def test_dedup_disabled_by_default(self, mock_charts):
+        first = self.post(self.data)
+        second = self.post(self.data)
+        self.assertNotEqual(json.loads(first.data)['id'], json.loads(second.data)['id'])
+
+class TestCompareBudgets(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            budgets = []
+            for name, phone_bill in [('Base', '80'), ('Cheaper Phone', '40')]:
+                data = {**SAMPLE_INPUT, 'phone_bill': phone_bill}
+                budget = Budget(name=name, input_data=json.dumps(data),
+                                calculations=json.dumps(calculate_budget(data).to_dict()))
+                db.session.add(budget)
+                budgets.append(budget)
+            db.session.commit()
+            self.budget_ids = [budget.id for budget in budgets]
+
+    def test_compare_returns_aligned_deltas(self):
+        response = self.client.post('/api/compare', json={'budget_ids': self.budget_ids})
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.data)
+        self.assertEqual(result['names'], ['Base', 'Cheaper Phone'])
+        self.assertEqual(result['fields']['total_expenses']['delta'], [0.0, -40.0])
+        self.assertAlmostEqual(result['fields']['liquid_savings']['delta'][1], 40.0)
+        self.assertAlmostEqual(result['projections']['1_year']['liquid']['delta'][1], 480.0)
+        self.assertLess(result['expense_shares']['phone_bill']['delta'][1], 0)
+        self.assertNotIn('chart', result)
+
+    def test_compare_missing_budget(self):
+        response = self.client.post('/api/compare', json={'budget_ids': [self.budget_ids[0], 9999]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.data)['missing_ids'], [9999])
+
+    def test_compare_rejects_bad_ids(self):
+        response = self.client.post('/api/compare', json={'budget_ids': []})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/compare', json={'budget_ids': self.budget_ids, 'baseline_id': 9999})
+        self.assertEqual(response.status_code, 400)
+
+class TestBudgetSearch(AppTestCase):
+    names = ['Vacation Fund', 'Vacation', 'Summer vacation plan', 'Budget 2024-05-01 10:30', 'Budget 2024-06-01 09:00',
+             '100% Savings']
+
+    def setUp(self):
+        super().setUp()
+        calculations = json.dumps(calculate_budget(SAMPLE_INPUT).to_dict())
+        with self.app.app_context():
+            for name in self.names:
+                db.session.add(Budget(name=name, input_data=json.dumps(SAMPLE_INPUT), calculations=calculations))
+            db.session.commit()
+
+    def test_search_orders_by_distance(self):
+        response = self.client.get('/api/budgets/search?q=Vacation')
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)
+        self.assertEqual([result['name'] for result in results], ['Vacation', 'Vacation Fund', 'Summer vacation plan'])
+        self.assertEqual(results[0]['distance'], 0)
+        self.assertIn('monthly_income', results[0])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_search_escapes_like_wildcards(self):
+        results = json.loads(self.client.get('/api/budgets/search?q=100%').data)
+        self.assertEqual([result['name'] for result in results], ['100% Savings'])
+        self.assertEqual(json.loads(self.client.get('/api/budgets/search?q=___').data), [])
+
+    def test_search_and_list_cursor_pagination(self):
+        first = self.client.get('/api/budgets/search?q=budget 2024&limit=1')
+        second = self.client.get(f"/api/budgets/search?q=budget 2024&limit=1&cursor={first.headers['X-Next-Cursor']}")
+        names = [json.loads(page.data)[0]['name'] for page in (first, second)]
+        self.assertEqual(sorted(names), ['Budget 2024-05-01 10:30', 'Budget 2024-06-01 09:00'])
+        self.assertNotIn('X-Next-Cursor', second.headers)
+
+        seen, cursor = [], ''
+        while cursor is not None:
+            page = self.client.get(f'/api/budgets?limit=4&cursor={cursor}' if cursor else '/api/budgets?limit=4')
+            seen.extend(budget['name'] for budget in json.loads(page.data))
+            cursor = page.headers.get('X-Next-Cursor')
+        self.assertEqual(seen, list(reversed(self.names)))
+
+    def test_search_rejects_bad_input(self):
+        self.assertEqual(self.client.get('/api/budgets/search?q=').status_code, 400)
+        self.assertEqual(self.client.get('/api/budgets/search?q=va').status_code, 400)
+        self.assertEqual(self.client.get('/api/budgets/search?q=vac&limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/budgets/search?q=vac&cursor=bogus').status_code, 400)
+
+class TestPercentileRank(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            budgets = []
+            for rent in ['800', '1200', '1600', '2000']:
+                data = {**SAMPLE_INPUT, 'rent_mortgage': rent}
+                budget = Budget(name=f'Rent {rent}', input_data=json.dumps(data),
+                                calculations=json.dumps(calculate_budget(data).to_dict()))
+                db.session.add(budget)
+                budgets.append(budget)
+            db.session.commit()
+            self.budget_ids = [budget.id for budget in budgets]
+
+    def rank(self, budget_id):
+        response = self.client.get(f'/api/budget/{budget_id}/rank')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_rank_reports_percentiles_and_staleness(self):
+        result = self.rank(self.budget_ids[0])
+        self.assertEqual(result['metrics']['savings_rate']['percentile'], 87.5)
+        self.assertEqual(result['metrics']['housing_ratio']['percentile'], 12.5)
+        self.assertEqual(result['metrics']['monthly_income']['percentile'], 50.0)
+        self.assertFalse(result['metrics']['expense_ratio']['higher_is_better'])
+        self.assertEqual(result['index']['population'], 4)
+        self.assertFalse(result['index']['stale'])
+        self.assertEqual(result['index']['updates_since_build'], 0)
+
+    @patch('routes.generate_charts', return_value={})
+    def test_index_updates_incrementally(self, mock_charts):
+        self.rank(self.budget_ids[0])
+        response = self.client.post('/api/calculate', json={**SAMPLE_INPUT, 'rent_mortgage': '400'})
+        new_id = int(json.loads(response.data)['id'])
+        self.client.delete(f'/api/budget/{self.budget_ids[3]}')
+        self.client.patch(f'/api/budget/{self.budget_ids[1]}', json={'rent_mortgage': '300'})
+        result = self.rank(new_id)
+        self.assertEqual(result['index']['population'], 4)
+        self.assertEqual(result['index']['updates_since_build'], 3)
+        self.assertEqual(result['metrics']['savings_rate']['percentile'], 62.5)
+        self.assertEqual(self.rank(self.budget_ids[1])['metrics']['savings_rate']['percentile'], 87.5)
+
+    def test_rank_missing_budget(self):
+        self.assertEqual(self.client.get('/api/budget/9999/rank').status_code, 404)
+
+class TestBulkFetch(AppTestCase):
+    data = {**SAMPLE_INPUT, 'retirement_401k': '5', 'employer_401k_match': '3', 'rent_mortgage': '2400'}
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            budgets = []
+            for name in ['First', 'Second']:
+                budget = Budget(name=name, input_data=json.dumps(self.data),
+                                calculations=json.dumps(calculate_budget(self.data).to_dict()),
+                                charts=json.dumps({'expense_breakdown': 'pie'}))
+                db.session.add(budget)
+                budgets.append(budget)
+            db.session.commit()
+            self.budget_ids = [budget.id for budget in budgets]
+
+    def fetch(self, query):
+        statements = []
+        with self.app.app_context():
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            sqlalchemy.event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = self.client.get(f'/api/budgets/bulk?{query}')
+            finally:
+                sqlalchemy.event.remove(db.engine, 'before_cursor_execute', listener)
+        return response, [statement for statement in statements if statement.lstrip().startswith('SELECT')]
+
+    def test_bulk_returns_sparse_fieldsets_in_one_query(self):
+        first, second = self.budget_ids
+        response, selects = self.fetch(f'ids={second},{first},9999&include=calculations')
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.data)
+        self.assertEqual([budget['name'] for budget in result['budgets']], ['Second', 'First'])
+        self.assertEqual(result['missing_ids'], [9999])
+        self.assertIn('calculations', result['budgets'][0])
+        self.assertNotIn('charts', result['budgets'][0])
+        self.assertNotIn('input_data', result['budgets'][0])
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn('budgets.charts', selects[0])
+        self.assertNotIn('budgets.input_data', selects[0])
+
+    def test_bulk_embeds_recommendations(self):
+        first, second = self.budget_ids
+        response, selects = self.fetch(f'ids={first},{second}&include=input_data,calculations,recommendations')
+        budgets = json.loads(response.data)['budgets']
+        expected = json.loads(self.client.get(f'/api/recommendations/{first}').data)
+        self.assertEqual(budgets[0]['recommendations'], expected)
+        self.assertTrue(any(rec['title'] == 'High Housing Costs' for rec in expected))
+        response, selects = self.fetch(f'ids={first},{second}&include=recommendations')
+        self.assertEqual(json.loads(response.data)['budgets'][1]['recommendations'], expected)
+        self.assertEqual(len(selects), 1)
+
+    def test_bulk_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get('/api/budgets/bulk').status_code, 400)
+        self.assertEqual(self.client.get('/api/budgets/bulk?ids=1,x').status_code, 400)
+        self.assertEqual(self.client.get('/api/budgets/bulk?ids=1&include=secrets').status_code, 400)
+
+class TestIncrementalUpdate(AppTestCase):
+    data = {**SAMPLE_INPUT_401K, 'name': 'Editable Budget'}
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            budget = Budget(name=self.data['name'], input_data=json.dumps(self.data),
+                            calculations=json.dumps(calculate_budget(self.data).to_dict()),
+                            charts=json.dumps({'expense_breakdown': 'old-pie',
+                                               'savings_projection': 'old-projection',
+                                               '401k_breakdown': 'old-401k'}))
+            db.session.add(budget)
+            db.session.commit()
+            self.budget_id = budget.id
+
+    def test_dependency_graph_covers_every_changed_output(self):
+        base = calculate_budget(self.data).to_dict()
+        for field in INPUT_FIELDS:
+            value = 'weekly' if field == 'pay_frequency' else str(float(self.data[field]) + 7)
+            changed = calculate_budget({**self.data, field: value}).to_dict()
+            differing = {name for name in base if base[name] != changed[name]}
+            self.assertLessEqual(differing, affected_fields({field}), field)
+
+    @patch('routes.generate_charts')
+    def test_patch_rerenders_only_affected_charts(self, mock_charts):
+        mock_charts.side_effect = lambda calc, budget_id, only=None, chart_format='png': {name: f'new-{name}' for name in only}
+        response = self.client.patch(f'/api/budget/{self.budget_id}', json={'phone_bill': '40'})
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.data)
+        self.assertEqual(mock_charts.call_args.kwargs['only'], {'expense_breakdown', 'savings_projection'})
+        self.assertEqual(result['charts']['401k_breakdown'], 'old-401k')
+        self.assertEqual(result['charts']['expense_breakdown'], 'new-expense_breakdown')
+        self.assertEqual(result['calculations']['total_expenses'], 1690)
+        self.assertNotIn('monthly_401k_total', result['recomputed']['fields'])
+        self.assertEqual(result['version'], 2)
+        self.assertEqual(response.headers['ETag'], f'"{self.budget_id}-2"')
+
+    @patch('routes.generate_charts', return_value={})
+    def test_patch_pay_frequency_case_recomputes(self, mock_charts):
+        self.client.patch(f'/api/budget/{self.budget_id}', json={'pay_frequency': 'weekly'})
+        response = self.client.patch(f'/api/budget/{self.budget_id}', json={'pay_frequency': 'Weekly'})
+        result = json.loads(response.data)
+        self.assertIn('monthly_income', result['recomputed']['fields'])
+        expected = calculate_budget({**self.data, 'pay_frequency': 'Weekly'})['monthly_income']
+        self.assertEqual(result['calculations']['monthly_income'], expected)
+
+    @patch('routes.generate_charts')
+    def test_patch_without_changes_keeps_version(self, mock_charts):
+        response = self.client.patch(f'/api/budget/{self.budget_id}', json={'phone_bill': 80})
+        self.assertEqual(json.loads(response.data)['version'], 1)
+        mock_charts.assert_not_called()
+
+    def test_patch_rejects_unknown_and_invalid_fields(self):
+        response = self.client.patch(f'/api/budget/{self.budget_id}', json={'savings_rate': 50})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(f'/api/budget/{self.budget_id}', json={'phone_bill': '-5'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch('/api/budget/9999', json={'phone_bill': '40'})
+        self.assertEqual(response.status_code, 404)
+        for body in ([1], 'rent', 5):
+            response = self.client.patch(f'/api/budget/{self.budget_id}', json=body)
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_get_honours_if_none_match(self):
+        response = self.client.get(f'/api/budget/{self.budget_id}', headers={'If-None-Match': f'"{self.budget_id}-1"'})
+        self.assertEqual(response.status_code, 304)
+
+    @patch('routes.generate_charts', return_value={'expense_breakdown': 'lazy-pie'})
+    def test_lazy_charts_bump_version(self, mock_charts):
+        with self.app.app_context():
+            db.session.get(Budget, self.budget_id).charts = None
+            db.session.commit()
+        etag = f'"{self.budget_id}-1"'
+        response = self.client.get(f'/api/budget/{self.budget_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['charts'], {'expense_breakdown': 'lazy-pie'})
+        self.assertEqual(response.headers['ETag'], f'"{self.budget_id}-2"')
+        mock_charts.assert_called_once()
+
+    def test_explicit_chart_format_skips_not_modified(self):
+        etag = f'"{self.budget_id}-1"'
+        response = self.client.get(f'/api/budget/{self.budget_id}?chart_format=svg', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+        response = self.client.get(f'/api/budget/{self.budget_id}?chart_format=png')
+        self.assertEqual(response.headers['ETag'], etag)
+
+class TestRecommendationsCache(AppTestCase):
+    data = {**SAMPLE_INPUT, 'name': 'Cached Budget', 'retirement_401k': '5', 'employer_401k_match': '3'}
+
+    def setUp(self):
+        super().setUp()
+        self.cache = self.app.extensions['recommendations_cache']
+
+    @patch('routes.generate_charts', return_value={})
+    def create_budget(self, mock_charts):
+        response = self.client.post('/api/calculate', json=self.data)
+        return int(json.loads(response.data)['id'])
+
+    def test_recommendations_precomputed_at_create(self):
+        budget_id = self.create_budget()
+        with self.app.app_context():
+            budget = db.session.get(Budget, budget_id)
+            self.assertIsNotNone(budget.recommendations)
+        with patch('routes.serialization.loads') as mock_loads:
+            response = self.client.get(f'/api/recommendations/{budget_id}')
+            mock_loads.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(json.loads(response.data)[0]['title'], 'Excellent Savings Rate')
+
+    def test_recommendations_refresh_after_patch_and_delete(self):
+        budget_id = self.create_budget()
+        with patch('routes.generate_charts', return_value={}):
+            self.client.patch(f'/api/budget/{budget_id}', json={'rent_mortgage': '3000'})
+        titles = [rec['title'] for rec in json.loads(self.client.get(f'/api/recommendations/{budget_id}').data)]
+        self.assertIn('High Housing Costs', titles)
+        self.client.delete(f'/api/budget/{budget_id}')
+        self.assertEqual(self.client.get(f'/api/recommendations/{budget_id}').status_code, 404)
+
+    def test_recommendations_computed_for_legacy_rows(self):
+        with self.app.app_context():
+            budget = Budget(name='Legacy', input_data=json.dumps(self.data),
+                            calculations=json.dumps(calculate_budget(self.data).to_dict()))
+            db.session.add(budget)
+            db.session.commit()
+            budget_id = budget.id
+        response = self.client.get(f'/api/recommendations/{budget_id}')
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertIsNotNone(db.session.get(Budget, budget_id).recommendations)
+
+    def test_lru_cache_eviction_and_ttl(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        expiring = LRUCache(max_size=2, ttl=0.01)
+        expiring.set('a', 1)
+        time.sleep(0.02)
+        self.assertIsNone(expiring.get('a'))
+
+class TestAdmissionControl(AppTestCase):
+    config = {
+        'CHART_RENDER_CONCURRENCY': 0,
+        'CHART_RENDER_QUEUE_SIZE': 0,
+        'LAZY_CHART_CONCURRENCY': 0,
+        'LAZY_CHART_QUEUE_SIZE': 0
+    }
+    data = {**SAMPLE_INPUT, 'name': 'Burst Budget'}
+
+    def test_limiter_sheds_when_queue_full_or_timed_out(self):
+        limiter = AdmissionLimiter('test', max_concurrent=1, max_queue=1, queue_timeout=0.01)
+        limiter.acquire()
+        with self.assertRaises(Overloaded):
+            limiter.acquire()
+        limiter.max_queue = 0
+        with self.assertRaises(Overloaded):
+            limiter.acquire()
+        limiter.release()
+        with limiter.slot():
+            self.assertEqual(limiter.stats()['in_flight'], 1)
+        stats = limiter.stats()
+        self.assertEqual(stats['shed_timeout'], 1)
+        self.assertEqual(stats['shed_queue_full'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+
+    @patch('routes.generate_charts', return_value={})
+    def test_saturated_create_returns_503(self, mock_charts):
+        response = self.client.post('/api/calculate', json=self.data)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '5')
+        mock_charts.assert_not_called()
+        health = json.loads(self.client.get('/api/health').data)
+        self.assertEqual(health['admission']['chart_render']['shed'], 1)
+
+    @patch('routes.generate_charts', return_value={})
+    def test_degraded_mode_saves_without_charts(self, mock_charts):
+        self.app.config['DEGRADED_MODE'] = True
+        response = self.client.post('/api/calculate', json=self.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Charts-Deferred'], 'true')
+        budget_id = json.loads(response.data)['id']
+        response = self.client.get(f'/api/budget/{budget_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Charts-Deferred'], 'true')
+        self.assertNotIn('ETag', response.headers)
+        mock_charts.assert_not_called()
+
+class TestMemoryProfiling(AppTestCase):
+    config = {'ADMIN_TOKEN': 'secret'}
+    headers = {'X-Admin-Token': 'secret'}
+
+    def setUp(self):
+        super().setUp()
+        self.profiler = self.app.extensions['memory_profiler']
+        self.profiler.sample_settle_seconds = 0
+
+    def tearDown(self):
+        self.profiler.stop()
+        super().tearDown()
+
+    def test_requests_skip_profiler_while_sampling_is_off(self):
+        with patch.object(self.profiler, 'begin_request') as mock_begin:
+            self.client.get('/api/budgets')
+            self.client.post('/api/admin/memory/start', json={'sample_requests': False}, headers=self.headers)
+            self.client.get('/api/budgets')
+        mock_begin.assert_not_called()
+
+    def test_sampling_waits_for_requests_started_before_it(self):
+        self.profiler.sample_settle_seconds = 60
+        self.client.post('/api/admin/memory/start', json={'sample_requests': True}, headers=self.headers)
+        self.client.get('/api/budgets')
+        self.assertNotIn('api.get_budgets', self.profiler.endpoint_peaks)
+        self.assertEqual(self.profiler.in_flight, 0)
+
+    def test_disabled_without_admin_token(self):
+        app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'ADMIN_TOKEN': None})
+        self.assertNotIn('memory_profiler', app.extensions)
+        self.assertEqual(app.test_client().get('/api/admin/memory').status_code, 404)
+
+    def test_requires_admin_token(self):
+        self.assertEqual(self.client.get('/api/admin/memory').status_code, 403)
+        self.assertEqual(self.client.get('/api/admin/memory', headers={'X-Admin-Token': 'wrong'}).status_code, 403)
+
+    def test_snapshot_diff_and_request_sampling(self):
+        response = self.client.post('/api/admin/memory/start', json={'frames': 5, 'sample_requests': True},
+                                    headers=self.headers)
+        self.assertTrue(json.loads(response.data)['tracing'])
+        first = json.loads(self.client.post('/api/admin/memory/snapshots', headers=self.headers).data)
+        retained = [bytearray(1024) for _ in range(200)]
+        self.client.get('/api/budgets')
+        second = json.loads(self.client.post('/api/admin/memory/snapshots', headers=self.headers).data)
+        self.assertEqual(second['id'], first['id'] + 1)
+        diff = json.loads(self.client.get('/api/admin/memory/diff?group_by=filename',
+                                          headers=self.headers).data)
+        self.assertGreater(diff['total_size_diff_kb'], 100)
+        self.assertTrue(any(entry['file'] == __file__ for entry in diff['top']))
+        status = json.loads(self.client.get('/api/admin/memory', headers=self.headers).data)
+        self.assertIn('api.get_budgets', status['endpoints'])
+        self.assertIn('open', status['matplotlib_figures'])
+        self.assertEqual(len(retained), 200)
+        stopped = json.loads(self.client.post('/api/admin/memory/stop', headers=self.headers).data)
+        self.assertFalse(stopped['tracing'])
+
+    def test_overlapping_requests_are_not_sampled(self):
+        self.client.post('/api/admin/memory/start', json={'sample_requests': True}, headers=self.headers)
+        self.profiler.begin_request()
+        self.client.get('/api/budgets')
+        self.profiler.end_request()
+        status = json.loads(self.client.get('/api/admin/memory', headers=self.headers).data)
+        self.assertNotIn('api.get_budgets', status['endpoints'])
+        self.assertEqual(status['skipped_samples'], 1)
+        self.client.get('/api/budgets')
+        self.assertEqual(self.profiler.endpoint_peaks['api.get_budgets']['requests'], 1)
+        self.assertEqual(self.profiler.in_flight, 0)
+
+class TestSerialization(unittest.TestCase):
+    def test_budget_calculation_round_trip(self):
+        result = calculate_budget(SAMPLE_INPUT_401K)
+        decoded = serialization.loads(serialization.dumps(result))
+        self.assertEqual(decoded, json.loads(json.dumps(result.to_dict())))
+        self.assertEqual(list(decoded), result.keys())
+
+    def test_stdlib_fallback(self):
+        result = calculate_budget(SAMPLE_INPUT_401K)
+        with patch.object(serialization, 'orjson', None):
+            encoded = serialization.dumps(result)
+            self.assertEqual(serialization.loads(encoded), json.loads(json.dumps(result.to_dict())))
+
+    def test_budget_calculation_mapping_access(self):
+        result = calculate_budget(SAMPLE_INPUT_401K)
+        self.assertEqual(result['monthly_income'], result.monthly_income)
+        self.assertIn('savings_rate', result)
+        self.assertIsNone(result.get('monthly_savings'))
+        with self.assertRaises(KeyError):
+            result['monthly_savings']
+
+class TestSvgCharts(AppTestCase):
+    data = {**SAMPLE_INPUT_401K, 'name': 'Vector Budget'}
+
+    def test_svg_charts_are_valid_documents(self):
+        charts = svg_charts.generate_svg_charts(calculate_budget(self.data))
+        self.assertEqual(set(charts), {'expense_breakdown', 'savings_projection', '401k_breakdown'})
+        for name, chart in charts.items():
+            self.assertTrue(svg_charts.is_svg(chart), name)
+            root = ET.fromstring(base64.b64decode(chart))
+            self.assertEqual(root.tag, '{http://www.w3.org/2000/svg}svg')
+        pie = base64.b64decode(charts['expense_breakdown']).decode()
+        self.assertIn('Monthly Budget Breakdown', pie)
+        self.assertIn('Employer 401k Match', pie)
+
+    def test_401k_chart_skipped_without_contributions(self):
+        calc = calculate_budget({**self.data, 'retirement_401k': '0', 'employer_401k_match': '0'})
+        self.assertNotIn('401k_breakdown', svg_charts.generate_svg_charts(calc))
+
+    def test_nice_ticks_cover_range(self):
+        ticks = svg_charts.nice_ticks(-1234, 98765)
+        self.assertLessEqual(ticks[0], -1234)
+        self.assertGreaterEqual(ticks[-1], 98765)
+
+    @patch('startup.load_chart_stack', side_effect=AssertionError('matplotlib should not load'))
+    def test_calculate_with_svg_format_skips_matplotlib(self, mock_stack):
+        response = self.client.post('/api/calculate?chart_format=svg', json=self.data)
+        self.assertEqual(response.status_code, 200)
+        charts = json.loads(response.data)['charts']
+        self.assertTrue(all(svg_charts.is_svg(chart) for chart in charts.values()))
+
+    def test_rejects_unknown_chart_format(self):
+        response = self.client.post('/api/calculate?chart_format=gif', json=self.data)
+        self.assertEqual(response.status_code, 400)
+
+class TestHealthStream(AppTestCase):
+    config = {'HEALTH_STREAM_INTERVAL': 0.05, 'HEALTH_STREAM_HEARTBEAT': 0.02}
+
+    def setUp(self):
+        super().setUp()
+        self.sampler = self.app.extensions['health_sampler']
+
+    def open_stream(self, headers=None):
+        response = self.client.get('/api/health/stream', headers=headers or {})
+        self.addCleanup(response.close)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        return response, (chunk.decode() for chunk in response.response)
+
+    def next_event(self, events):
+        for chunk in events:
+            if chunk.startswith('id: '):
+                lines = chunk.strip().split('\n')
+                return int(lines[0][4:]), json.loads(lines[2][6:])
+        self.fail('stream ended')
+
+    def test_subscribers_share_one_sampler(self):
+        self.client.get('/api/budgets')
+        first, first_events = self.open_stream()
+        self.assertTrue(next(first_events).startswith('retry: 50'))
+        event_id, data = self.next_event(first_events)
+        self.assertEqual(data['status'], 'healthy')
+        self.assertIn('api.get_budgets', data['requests']['endpoints'])
+        second, second_events = self.open_stream()
+        next(second_events)
+        self.assertGreaterEqual(self.next_event(second_events)[0], event_id)
+        self.assertEqual(self.sampler.stats()['subscribers'], 2)
+        sampler_threads = [thread for thread in threading.enumerate() if thread.name == 'health-sampler']
+        self.assertEqual(len(sampler_threads), 1)
+        first.close()
+        second.close()
+        self.assertEqual(self.sampler.stats()['subscribers'], 0)
+
+    def test_reconnect_resumes_after_last_event_id(self):
+        response, events = self.open_stream()
+        next(events)
+        event_id, _ = self.next_event(events)
+        response.close()
+        response, events = self.open_stream({'Last-Event-ID': str(self.sampler.sequence)})
+        next(events)
+        chunks = [next(events) for _ in range(3)]
+        self.assertTrue(all(chunk.startswith((': heartbeat', 'id: ')) for chunk in chunks))
+        self.assertGreater(self.next_event(events)[0], event_id)
+        response.close()
+
+    def test_health_reports_endpoint_latency(self):
+        for _ in range(3):
+            self.client.get('/api/budgets')
+        stats = json.loads(self.client.get('/api/health').data)['requests']['endpoints']['api.get_budgets']
+        self.assertEqual(stats['requests'], 3)
+        self.assertGreater(stats['requests_per_second'], 0)
+        self.assertIsNotNone(stats['p95_ms'])
+
+class TestFastStart(AppTestCase):
+    config = {'FAST_START': True}
+
+    def test_fast_start_defers_schema_creation(self):
+        with self.app.app_context():
+            self.assertFalse(db.inspect(db.engine).has_table('budgets'))
+        result = self.app.test_cli_runner().invoke(args=['init-db'])
+        self.assertEqual(result.exit_code, 0)
+        with self.app.app_context():
+            self.assertTrue(db.inspect(db.engine).has_table('budgets'))
+
+    def test_health_reports_startup_profile(self):
+        self.app.test_cli_runner().invoke(args=['init-db'])
+        self.client.get('/api/budgets')
+        response = self.client.get('/api/health')
+        self.assertEqual(response.status_code, 200)
+        startup_data = json.loads(response.data)['startup']
+        self.assertIn('phases', startup_data)
+        self.assertIsNotNone(startup_data['first_request'])
+
+    def test_startup_profile_is_per_app(self):
+        self.client.get('/api/budgets')
+        other = create_app({'TESTING': True, 'FAST_START': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+        profile = other.extensions['startup_profile']
+        self.assertIsNot(profile, self.app.extensions['startup_profile'])
+        self.assertIsNone(profile.first_request)
+        self.assertEqual([phase['phase'] for phase in profile.phases],
+                         ['create_app:extensions', 'create_app:blueprints'])
+
 if __name__ == '__main__':
     unittest.main()
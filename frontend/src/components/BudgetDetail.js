@@ -64,8 +64,16 @@ const BudgetDetail = () => {
 
   const fetchBudgetDetail = useCallback(async () => {
     try {
-      const response = await axios.get(API_ENDPOINTS.BUDGET(id));
-      setBudget(response.data);
+      const response = await axios.get(
+        API_ENDPOINTS.BUDGETS_BULK([id], ['input_data', 'calculations', 'recommendations'])
+      );
+      const [detail] = response.data.budgets;
+      if (!detail) {
+        setError('Budget not found.');
+        return;
+      }
+      setBudget(detail);
+      setRecommendations(detail.recommendations || []);
     } catch (err) {
       setError('Failed to load budget details. Please try again.');
       console.error('Error fetching budget:', err);
@@ -74,22 +82,9 @@ const BudgetDetail = () => {
     }
   }, [id]);
 
-  const fetchRecommendations = useCallback(async () => {
-    try {
-      const response = await axios.get(API_ENDPOINTS.RECOMMENDATIONS(id));
-      setRecommendations(response.data);
-    } catch (err) {
-      console.error('Error fetching recommendations:', err);
-    }
-  }, [id]);
-
   useEffect(() => {
-    const loadData = async () => {
-      await fetchBudgetDetail();
-      await fetchRecommendations();
-    };
-    loadData();
-  }, [fetchBudgetDetail, fetchRecommendations]);
+    fetchBudgetDetail();
+  }, [fetchBudgetDetail]);
 
   const getSavingsRateColor = (rate) => {
     if (rate >= 20) return 'success';
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useRef } from 'react';
 import {
   Container,
   Typography,
@@ -28,6 +28,7 @@ const BudgetForm = () => {
   const [error, setError] = useState(null);
   const [success, setSuccess] = useState(false);
   const [validationErrors, setValidationErrors] = useState({});
+  const idempotencyKey = useRef(null);
   const [formData, setFormData] = useState({
     name: '',
     yearly_salary: '',
@@ -42,6 +43,7 @@ const BudgetForm = () => {
   });
   const handleInputChange = (e) => {
     const { name, value } = e.target;
+    idempotencyKey.current = null;
     setFormData(prev => ({
       ...prev,
       [name]: value
@@ -78,9 +80,17 @@ const BudgetForm = () => {
     if (!validateForm()) {
       return;
     }
+    if (loading) {
+      return;
+    }
+    if (!idempotencyKey.current) {
+      idempotencyKey.current = window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
     try {
       setLoading(true);
-      const response = await axios.post(API_ENDPOINTS.CREATE_BUDGET, formData);
+      const response = await axios.post(API_ENDPOINTS.CREATE_BUDGET, formData, {
+        headers: { 'Idempotency-Key': idempotencyKey.current }
+      });
       setSuccess(true);
       setTimeout(() => {
         navigate(`/budget/${response.data.id}`);
@@ -13,7 +13,8 @@ import {
   CircularProgress,
   Tabs,
   Tab,
-  Paper
+  Paper,
+  TextField
 } from '@mui/material';
 import {
   Visibility as ViewIcon,
@@ -27,15 +28,39 @@ import axios from 'axios';
 import { API_ENDPOINTS } from '../config/api';
 import SystemMonitor from './SystemMonitor';
 
+const MIN_SEARCH_LENGTH = 3;
+
 const Dashboard = () => {
   const [budgets, setBudgets] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [activeTab, setActiveTab] = useState(0);
+  const [searchQuery, setSearchQuery] = useState('');
   const navigate = useNavigate();
   useEffect(() => {
     fetchBudgets();
   }, []);
+  useEffect(() => {
+    if (searchQuery.trim().length < MIN_SEARCH_LENGTH) {
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(API_ENDPOINTS.SEARCH_BUDGETS(searchQuery.trim()), { params: { limit: 100 } });
+        setBudgets(response.data);
+      } catch (err) {
+        setError('Failed to search budgets. Please try again.');
+        console.error('Error searching budgets:', err);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+  const handleSearchChange = (event) => {
+    setSearchQuery(event.target.value);
+    if (event.target.value.trim().length < MIN_SEARCH_LENGTH && searchQuery.trim().length >= MIN_SEARCH_LENGTH) {
+      fetchBudgets();
+    }
+  };
   const fetchBudgets = async () => {
     try {
       setLoading(true);
@@ -114,7 +139,20 @@ const Dashboard = () => {
         </Tabs>
       </Paper>
       {activeTab === 0 && (
-        budgets.length === 0 ? (
+        <TextField
+          fullWidth
+          label="Search budgets by name"
+          value={searchQuery}
+          onChange={handleSearchChange}
+          sx={{ mb: 3 }}
+        />
+      )}
+      {activeTab === 0 && (
+        budgets.length === 0 && searchQuery.trim().length >= MIN_SEARCH_LENGTH ? (
+          <Typography variant="body1" color="text.secondary" sx={{ textAlign: 'center', py: 6 }}>
+            No budgets match "{searchQuery.trim()}"
+          </Typography>
+        ) : budgets.length === 0 ? (
           <Card>
             <CardContent sx={{ textAlign: 'center', py: 6 }}>
               <AccountBalanceIcon sx={{ fontSize: 80, color: 'text.secondary', mb: 2 }} />
@@ -44,8 +44,19 @@ const SystemMonitor = () => {
   };
   useEffect(() => {
     fetchHealthData();
-    const interval = setInterval(fetchHealthData, 30000);
-    return () => clearInterval(interval);
+    if (typeof EventSource === 'undefined') {
+      const interval = setInterval(fetchHealthData, 30000);
+      return () => clearInterval(interval);
+    }
+    // The browser reconnects on its own and resumes from the last event ID.
+    const source = new EventSource(API_ENDPOINTS.HEALTH_STREAM);
+    source.addEventListener('health', (event) => {
+      setHealthData(JSON.parse(event.data));
+      setLastUpdated(new Date());
+      setError(null);
+      setLoading(false);
+    });
+    return () => source.close();
   }, []);
   const getStatusColor = (status) => {
     switch (status) {
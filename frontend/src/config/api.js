@@ -2,10 +2,13 @@ const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
 export const API_ENDPOINTS = {
   BUDGETS: `${API_BASE_URL}/api/budgets`,
+  SEARCH_BUDGETS: (query) => `${API_BASE_URL}/api/budgets/search?q=${encodeURIComponent(query)}`,
+  BUDGETS_BULK: (ids, include) => `${API_BASE_URL}/api/budgets/bulk?ids=${ids.join(',')}&include=${include.join(',')}`,
   CREATE_BUDGET: `${API_BASE_URL}/api/calculate`,
   BUDGET: (id) => `${API_BASE_URL}/api/budget/${id}`,
   RECOMMENDATIONS: (id) => `${API_BASE_URL}/api/recommendations/${id}`,
   HEALTH: `${API_BASE_URL}/api/health`,
+  HEALTH_STREAM: `${API_BASE_URL}/api/health/stream`,
 };
 
 export default API_BASE_URL;